@@ -1,5 +1,32 @@
 from django.contrib import admin
-from .models import Customer
 
-# Register your models here.
-admin.site.register(Customer)
+from record.db import ReportingAdminMixin
+from .models import Customer, CustomerStats
+
+
+@admin.register(Customer)
+class CustomerAdmin(ReportingAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'code', 'city', 'manager', 'order_count', 'open_order_count', 'last_order_date')
+    list_select_related = ('manager', 'stats')
+
+    def _stats_value(self, obj, field):
+        return getattr(obj.stats, field) if hasattr(obj, 'stats') else None
+
+    @admin.display(description='Заказов')
+    def order_count(self, obj):
+        return self._stats_value(obj, 'order_count')
+
+    @admin.display(description='Открытых')
+    def open_order_count(self, obj):
+        return self._stats_value(obj, 'open_order_count')
+
+    @admin.display(description='Последний заказ')
+    def last_order_date(self, obj):
+        return self._stats_value(obj, 'last_order_date')
+
+
+@admin.register(CustomerStats)
+class CustomerStatsAdmin(ReportingAdminMixin, admin.ModelAdmin):
+    list_display = ('customer', 'order_count', 'open_order_count', 'total_area', 'last_order_date')
+    list_select_related = ('customer',)
+    readonly_fields = ('order_count', 'open_order_count', 'total_area', 'last_order_date')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from customers.stats import reconcile_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованную статистику заказчиков с заказами и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Исправить найденные расхождения (по умолчанию только отчет).')
+
+    def handle(self, *args, **options):
+        drift = reconcile_customer_stats(fix=options['fix'])
+        for customer_id, stored, actual in drift:
+            self.stdout.write(f'Заказчик {customer_id}: сохранено {stored}, фактически {actual}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Найдено расхождений: {len(drift)} (запустите с --fix)'))
@@ -1,5 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+
+from record.perf import operation
 from users.models import CustomUser
 
 
@@ -33,7 +35,46 @@ class Customer(models.Model):
         """
         return f"{self.name} ({self.code})"
 
+    @operation('customer.clean')
     def clean(self):
         """Валидация менеджера."""
         if self.manager and self.manager.department.name != 'коммерческий':
-            raise ValidationError({'manager': 'Менеджер должен быть из коммерческого отдела.'})
\ No newline at end of file
+            raise ValidationError({'manager': 'Менеджер должен быть из коммерческого отдела.'})
+
+
+class CustomerStats(models.Model):
+    """
+    Денормализованная статистика заказов заказчика.
+
+    Счетчики обновляются в транзакции записи заказа (Order.save(), удаление -
+    сигналом post_delete, см. customers.stats.apply_order_change) через
+    F()-выражения. Приращения считаются от заблокированной строки заказа,
+    поэтому параллельные изменения одного заказа не учитываются дважды.
+    Архивные заказы (orders.archive) учитываются: перенос в архив статистику
+    не меняет. Расхождения исправляет команда reconcile_customer_stats.
+
+    Атрибуты:
+        customer (OneToOneField): Связь с моделью Customer.
+        order_count (IntegerField): Количество заказов.
+        open_order_count (IntegerField): Количество незавершенных заказов.
+        total_area (FloatField): Суммарная общая площадь заказов.
+        last_order_date (DateField): Самая поздняя дата начала обработки заказа.
+                                     Может быть пустым.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='stats', verbose_name='Заказчик')
+    order_count = models.IntegerField(default=0, verbose_name='Количество заказов')
+    open_order_count = models.IntegerField(default=0, verbose_name='Открытые заказы')
+    total_area = models.FloatField(default=0, verbose_name='Общая площадь')
+    last_order_date = models.DateField(null=True, blank=True, verbose_name='Дата последнего заказа')
+
+    class Meta:
+        verbose_name = 'Статистика заказчика'
+        verbose_name_plural = 'Статистика заказчиков'
+
+    def __str__(self):
+        """
+        Возвращает строковое представление статистики заказчика.
+        Используется для отображения в админке.
+        """
+        return f"Stats for {self.customer_id}: {self.order_count} orders"
@@ -0,0 +1,180 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, FloatField, Max, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from record.db import reporting_db
+from .models import Customer, CustomerStats
+
+# Статус, при котором заказ больше не считается открытым
+CLOSED_STATUS = 'completed'
+
+STATS_FIELDS = ('order_count', 'open_order_count', 'total_area', 'last_order_date')
+# Поля заказа, от которых зависит статистика заказчика
+ORDER_FIELDS = ('customer_id', 'status', 'total_area', 'start_date')
+
+
+def is_open(status):
+    """Возвращает True, если заказ с указанным статусом считается открытым."""
+    return status != CLOSED_STATUS
+
+
+def apply_order_delta(customer_id, orders=0, open_orders=0, area=0.0, order_date=None, create_missing=True):
+    """
+    Атомарно изменяет счетчики статистики заказчика на указанные приращения.
+
+    Обновление выполняется через F()-выражения, поэтому параллельные изменения
+    не теряются. Дата последнего заказа только сдвигается вперед.
+    Если create_missing=False, отсутствующая строка статистики не создается
+    (используется при удалении, когда заказчик может удаляться каскадно).
+    """
+    updates = {}
+    if orders:
+        updates['order_count'] = F('order_count') + orders
+    if open_orders:
+        updates['open_order_count'] = F('open_order_count') + open_orders
+    if area:
+        updates['total_area'] = F('total_area') + area
+    if not updates and order_date is None:
+        return
+
+    with transaction.atomic():
+        stats = CustomerStats.objects.filter(customer_id=customer_id)
+        if updates and not stats.update(**updates):
+            if not create_missing:
+                return
+            CustomerStats.objects.get_or_create(customer_id=customer_id)
+            stats.update(**updates)
+        elif not updates and create_missing:
+            CustomerStats.objects.get_or_create(customer_id=customer_id)
+        if order_date is not None:
+            stats.filter(Q(last_order_date__isnull=True) | Q(last_order_date__lt=order_date)).update(
+                last_order_date=order_date)
+
+
+def _add_order(values, sign=1, create_missing=True):
+    apply_order_delta(
+        values['customer_id'],
+        orders=sign,
+        open_orders=sign * is_open(values['status']),
+        area=sign * (values['total_area'] or 0),
+        order_date=values['start_date'] if sign > 0 else None,
+        create_missing=create_missing,
+    )
+
+
+def apply_order_change(previous, current):
+    """
+    Обновляет статистику заказчика по изменению заказа.
+
+    previous и current - словари значений ORDER_FIELDS до и после записи
+    (previous=None для нового заказа, current=None для удаленного). Должна
+    вызываться в той же транзакции, что и запись заказа, а previous - читаться
+    из строки заказа с блокировкой (select_for_update), тогда два процесса,
+    меняющие один заказ, не учтут одно и то же изменение дважды.
+    """
+    if previous is None:
+        _add_order(current)
+    elif current is None:
+        _add_order(previous, sign=-1, create_missing=False)
+        if previous['start_date'] is not None:
+            refresh_last_order_date(previous['customer_id'])
+    elif previous['customer_id'] != current['customer_id']:
+        _add_order(previous, sign=-1, create_missing=False)
+        refresh_last_order_date(previous['customer_id'])
+        _add_order(current)
+    else:
+        apply_order_delta(
+            current['customer_id'],
+            open_orders=is_open(current['status']) - is_open(previous['status']),
+            area=(current['total_area'] or 0) - (previous['total_area'] or 0),
+        )
+        if current['start_date'] != previous['start_date']:
+            refresh_last_order_date(current['customer_id'])
+
+
+def refresh_last_order_date(customer_id):
+    """Пересчитывает дату последнего заказа, включая архивные (нужно после удаления или переноса заказа)."""
+    customer = Customer.objects.filter(pk=customer_id)
+    dates = [customer.aggregate(last=Max(f'{relation}__start_date'))['last']
+             for relation in ('orders', 'archived_orders')]
+    last_date = max((value for value in dates if value is not None), default=None)
+    CustomerStats.objects.filter(customer_id=customer_id).update(last_order_date=last_date)
+
+
+def compute_customer_stats(using=DEFAULT_DB_ALIAS):
+    """
+    Вычисляет фактическую статистику всех заказчиков по заказам основной
+    таблицы и архивным заказам (архивация статистику не меняет) - по одному
+    сгруппированному запросу на каждую таблицу.
+
+    Возвращает словарь {customer_id: {поле: значение}}. Запросы дорогие, поэтому
+    используются только для сверки, а не при отображении страниц.
+    """
+    customers = Customer.objects.using(using)
+    rows = customers.annotate(
+        order_count=Count('orders'),
+        open_order_count=Count('orders', filter=~Q(orders__status=CLOSED_STATUS)),
+        total_area=Coalesce(Sum('orders__total_area'), Value(0.0)),
+        last_order_date=Max('orders__start_date'),
+    ).values('pk', *STATS_FIELDS)
+    stats = {row.pop('pk'): row for row in rows}
+
+    # Площадь архивного заказа хранится только в полной записи (ArchivedOrder.data)
+    archived = customers.filter(archived_orders__isnull=False).values('pk').annotate(
+        order_count=Count('archived_orders'),
+        open_order_count=Count('archived_orders', filter=~Q(archived_orders__status=CLOSED_STATUS)),
+        total_area=Coalesce(Sum(Cast('archived_orders__data__total_area', FloatField())), Value(0.0)),
+        last_order_date=Max('archived_orders__start_date'),
+    )
+    for row in archived:
+        values = stats[row['pk']]
+        for field in ('order_count', 'open_order_count', 'total_area'):
+            values[field] += row[field]
+        dates = [value for value in (values['last_order_date'], row['last_order_date']) if value is not None]
+        values['last_order_date'] = max(dates, default=None)
+    return stats
+
+
+def reconcile_customer_stats(fix=False, tolerance=1e-6):
+    """
+    Сравнивает денормализованную статистику с фактической.
+
+    Возвращает список кортежей (customer_id, хранимые значения, фактические значения)
+    для расходящихся заказчиков. Если fix=True, расхождения исправляются.
+
+    Сверка без исправления читает с реплики (record.db.reporting_db()); при
+    fix=True обе стороны читаются из основной базы, чтобы не записать в нее
+    устаревшие значения реплики.
+    """
+    using = DEFAULT_DB_ALIAS if fix else reporting_db()
+    actual = compute_customer_stats(using)
+    stored = {stats.customer_id: stats for stats in CustomerStats.objects.using(using)}
+
+    drift = []
+    to_create = []
+    to_update = []
+    for customer_id, values in actual.items():
+        stats = stored.get(customer_id)
+        if stats is None:
+            drift.append((customer_id, None, values))
+            to_create.append(CustomerStats(customer_id=customer_id, **values))
+            continue
+        current = {field: getattr(stats, field) for field in STATS_FIELDS}
+        if _differs(current, values, tolerance):
+            drift.append((customer_id, current, values))
+            for field, value in values.items():
+                setattr(stats, field, value)
+            to_update.append(stats)
+
+    if fix and (to_create or to_update):
+        with transaction.atomic():
+            CustomerStats.objects.bulk_create(to_create)
+            CustomerStats.objects.bulk_update(to_update, STATS_FIELDS)
+    return drift
+
+
+def _differs(current, actual, tolerance):
+    """Сравнивает значения статистики с учетом погрешности суммы площадей."""
+    if abs((current['total_area'] or 0) - (actual['total_area'] or 0)) > tolerance:
+        return True
+    return any(current[field] != actual[field] for field in STATS_FIELDS if field != 'total_area')
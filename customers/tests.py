@@ -1,17 +1,23 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from .models import Customer
-from users.models import Department, CustomUser
+from orders.models import Order
+from .models import Customer, CustomerStats
+from .stats import reconcile_customer_stats
+from record.testing import SharedFixturesMixin, make_department, make_order, make_user
 
 
 class CustomerModelTest(TestCase):
-    def setUp(self):
-        self.commercial_department = Department.objects.create(name="Коммерческий")
-        self.design_department = Department.objects.create(name="Конструкторский")
-        self.manager = CustomUser.objects.create_user(username='manager', password='password',
-                                                      department=self.commercial_department)
-        self.non_manager = CustomUser.objects.create_user(username='non_manager', password='password',
-                                                          department=self.design_department)
+    @classmethod
+    def setUpTestData(cls):
+        cls.commercial_department = make_department("Коммерческий")
+        cls.design_department = make_department("Конструкторский")
+        cls.manager = make_user('manager', cls.commercial_department)
+        cls.non_manager = make_user('non_manager', cls.design_department)
 
     def test_customer_creation(self):
         """Проверяет создание заказчика."""
@@ -35,3 +41,86 @@ class CustomerModelTest(TestCase):
             customer.full_clean()
         self.assertIn('manager', context.exception.message_dict)
         self.assertEqual(context.exception.message_dict['manager'][0], 'Менеджер должен быть из коммерческого отдела.')
+
+
+class CustomerStatsTest(SharedFixturesMixin, TestCase):
+    def create_order(self, **kwargs):
+        fields = dict(start_date=date(2024, 10, 1), total_area=10.0)
+        fields.update(kwargs)
+        return make_order(self.customer, **fields)
+
+    def stats(self):
+        return CustomerStats.objects.get(customer=self.customer)
+
+    def test_stats_on_order_create(self):
+        """Проверяет обновление счетчиков при создании заказов."""
+        self.create_order()
+        self.create_order(start_date=date(2024, 11, 5), total_area=2.5)
+        stats = self.stats()
+        self.assertEqual(stats.order_count, 2)
+        self.assertEqual(stats.open_order_count, 2)
+        self.assertAlmostEqual(stats.total_area, 12.5)
+        self.assertEqual(stats.last_order_date, date(2024, 11, 5))
+
+    def test_stats_on_status_change(self):
+        """Проверяет изменение количества открытых заказов при смене статуса."""
+        order = self.create_order()
+        order.status = 'completed'
+        order.save()
+        self.assertEqual(self.stats().open_order_count, 0)
+        order.status = 'in_progress'
+        order.save()
+        self.assertEqual(self.stats().open_order_count, 1)
+        self.assertEqual(self.stats().order_count, 1)
+
+    def test_stale_instances_do_not_double_count(self):
+        """Проверяет, что два устаревших экземпляра, завершающие один заказ, уменьшают счетчик один раз."""
+        order = self.create_order()
+        self.create_order()
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+        first.status = second.status = 'completed'
+        first.save()
+        second.save()
+        self.assertEqual(self.stats().open_order_count, 1)
+
+    def test_stats_rolled_back_with_order(self):
+        """Проверяет, что запись заказа откатывается вместе с ошибкой обновления статистики."""
+        order = self.create_order()
+        order.status = 'completed'
+        with mock.patch('orders.models.apply_order_change', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                order.save()
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'accepted')
+        self.assertEqual(self.stats().open_order_count, 1)
+
+    def test_stats_on_order_delete(self):
+        """Проверяет уменьшение счетчиков и пересчет даты при удалении заказа."""
+        self.create_order()
+        latest = self.create_order(start_date=date(2024, 12, 1), total_area=5.0)
+        latest.delete()
+        stats = self.stats()
+        self.assertEqual(stats.order_count, 1)
+        self.assertEqual(stats.open_order_count, 1)
+        self.assertAlmostEqual(stats.total_area, 10.0)
+        self.assertEqual(stats.last_order_date, date(2024, 10, 1))
+
+    def test_customer_delete_with_orders(self):
+        """Проверяет, что каскадное удаление заказчика не ломается на статистике."""
+        self.create_order()
+        self.customer.delete()
+        self.assertFalse(CustomerStats.objects.exists())
+
+    def test_reconcile_fixes_drift(self):
+        """Проверяет обнаружение и исправление расхождений статистики."""
+        self.create_order()
+        CustomerStats.objects.filter(customer=self.customer).update(order_count=7, total_area=0)
+        drift = reconcile_customer_stats()
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(self.stats().order_count, 7)
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', '--fix', stdout=out)
+        self.assertIn('Исправлено расхождений: 1', out.getvalue())
+        self.assertEqual(self.stats().order_count, 1)
+        self.assertAlmostEqual(self.stats().total_area, 10.0)
+        self.assertEqual(reconcile_customer_stats(), [])
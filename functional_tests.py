@@ -1,25 +1,260 @@
-import unittest
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+"""
+Функциональные тесты на живом сервере Django.
 
+Запуск: python manage.py test functional_tests
+
+Тесты поднимают локальный сервер (StaticLiveServerTestCase) и работают через
+безголовый браузер: сначала пробуется Chromium/Chrome, затем Firefox. Если
+ни Selenium, ни браузер недоступны, используется режим чистого HTTP-клиента
+(urllib). Режим можно задать явно переменной FUNCTIONAL_BROWSER:
+auto (по умолчанию), chrome, firefox или http.
+
+Время загрузки ключевых страниц проверяется по бюджетам PAGE_BUDGETS
+(секунды, переопределяются переменными FUNCTIONAL_BUDGET_<СТРАНИЦА>).
+"""
+import atexit
+import os
+import time
+import urllib.parse
+import urllib.request
+from html.parser import HTMLParser
+from http.cookiejar import CookieJar
+
+from django.contrib.staticfiles.testing import StaticLiveServerTestCase
+
+from record.testing import make_department, make_user
+
+PAGE_BUDGETS = {
+    'login': 2.0,
+    'profile': 2.0,
+}
+
+_browser = None
+
+
+def page_budget(name):
+    return float(os.environ.get(f'FUNCTIONAL_BUDGET_{name.upper()}', PAGE_BUDGETS[name]))
+
+
+class _FormParser(HTMLParser):
+    """Собирает заголовок страницы, поля ввода и кнопки из HTML-ответа."""
+
+    def __init__(self):
+        super().__init__()
+        self.title = ''
+        self.tags = set()
+        self.inputs = {}
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        self.tags.add(tag)
+        self._in_title = tag == 'title'
+        if tag == 'input' and attrs.get('name'):
+            self.inputs[attrs['name']] = attrs.get('value', '')
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data.strip()
+
+
+class HttpClientBrowser:
+    """Минимальная замена браузеру поверх urllib: cookie, формы и CSRF-токен."""
+
+    name = 'http'
+
+    def __init__(self):
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.url = None
+        self.page_source = ''
+        self.page = _FormParser()
+
+    def _load(self, response):
+        self.url = response.geturl()
+        self.page_source = response.read().decode('utf-8')
+        self.page = _FormParser()
+        self.page.feed(self.page_source)
+
+    def get(self, url):
+        with self.opener.open(url) as response:
+            self._load(response)
+
+    def login(self, url, username, password):
+        self.get(url)
+        data = urllib.parse.urlencode({
+            'csrfmiddlewaretoken': self.page.inputs['csrfmiddlewaretoken'],
+            'username': username,
+            'password': password,
+        }).encode()
+        request = urllib.request.Request(url, data=data, headers={'Referer': url})
+        with self.opener.open(request) as response:
+            self._load(response)
+
+    @property
+    def title(self):
+        return self.page.title
+
+    def has_element(self, tag=None, name=None):
+        if name is not None:
+            return name in self.page.inputs
+        return tag in self.page.tags
+
+    def reset(self):
+        self.cookies.clear()
+
+    def quit(self):
+        pass
+
+
+class SeleniumBrowser:
+    """Обертка над Selenium WebDriver с тем же интерфейсом, что и HttpClientBrowser."""
+
+    WAIT_SECONDS = 10
+
+    def __init__(self, driver, name):
+        self.driver = driver
+        self.name = name
+
+    def get(self, url):
+        self.driver.get(url)
+
+    def login(self, url, username, password):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        self.get(url)
+        self.driver.find_element(By.NAME, 'username').send_keys(username)
+        self.driver.find_element(By.NAME, 'password').send_keys(password)
+        page = self.driver.find_element(By.TAG_NAME, 'html')
+        self.driver.find_element(By.TAG_NAME, 'button').click()
+        # Ждем загрузки ответа: при неверном пароле адрес не меняется, поэтому
+        # ждем, пока старая страница не будет заменена новой
+        WebDriverWait(self.driver, self.WAIT_SECONDS).until(EC.staleness_of(page))
+
+    @property
+    def url(self):
+        return self.driver.current_url
+
+    @property
+    def title(self):
+        return self.driver.title
+
+    @property
+    def page_source(self):
+        return self.driver.page_source
+
+    def has_element(self, tag=None, name=None):
+        from selenium.webdriver.common.by import By
+
+        if name is not None:
+            return bool(self.driver.find_elements(By.NAME, name))
+        return bool(self.driver.find_elements(By.TAG_NAME, tag))
+
+    def reset(self):
+        self.driver.delete_all_cookies()
+
+    def quit(self):
+        self.driver.quit()
+
+
+def _start_selenium(kind):
+    """Запускает безголовый браузер kind ('chrome' или 'firefox') или возвращает None."""
+    try:
+        from selenium import webdriver
+        from selenium.common.exceptions import WebDriverException
+    except ImportError:
+        return None
+
+    try:
+        if kind == 'chrome':
+            options = webdriver.ChromeOptions()
+            options.add_argument('--headless=new')
+            options.add_argument('--no-sandbox')
+            options.add_argument('--disable-dev-shm-usage')
+            return SeleniumBrowser(webdriver.Chrome(options=options), kind)
+        options = webdriver.FirefoxOptions()
+        options.add_argument('-headless')
+        return SeleniumBrowser(webdriver.Firefox(options=options), kind)
+    except WebDriverException:
+        return None
+
+
+def get_browser():
+    """
+    Возвращает общий для всех тестов модуля браузер, создавая его при первом вызове.
+    Запуск браузера - самая дорогая часть тестов, поэтому сессия переиспользуется.
+    """
+    global _browser
+    if _browser is None:
+        mode = os.environ.get('FUNCTIONAL_BROWSER', 'auto')
+        candidates = ['chrome', 'firefox'] if mode == 'auto' else [mode]
+        for kind in candidates:
+            if kind != 'http':
+                _browser = _start_selenium(kind)
+            if _browser is not None:
+                break
+        if _browser is None:
+            _browser = HttpClientBrowser()
+        atexit.register(_browser.quit)
+    return _browser
+
+
+class FunctionalTestCase(StaticLiveServerTestCase):
+    """Базовый класс: общий браузер, сброс cookie между тестами и замер времени страниц."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.browser = get_browser()
+        cls.timings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, elapsed in sorted(cls.timings.items()):
+            print(f'\n{cls.__name__}: {name} {elapsed * 1000:.1f} мс '
+                  f'(бюджет {page_budget(name) * 1000:.0f} мс, {cls.browser.name})', end='')
+        super().tearDownClass()
 
-class NewVisitorTest(unittest.TestCase):
     def setUp(self):
-        self.browser = webdriver.Edge()
+        self.browser.reset()
 
-    def tearDown(self):
-        self.browser.quit()
+    def timed(self, name, action, *args):
+        """Выполняет action(*args), записывает время и проверяет бюджет страницы name."""
+        started = time.perf_counter()
+        action(*args)
+        elapsed = time.perf_counter() - started
+        self.timings[name] = elapsed
+        self.assertLess(elapsed, page_budget(name),
+                        f'Страница {name} загружалась {elapsed:.3f} с ({self.browser.name})')
+        return elapsed
+
+
+class NewVisitorTest(FunctionalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('visitor', make_department('Конструкторский'), password='visitor-password')
 
     def test_can_start_login_form(self):
-        self.browser.get("http://localhost:8000/login/")
+        self.timed('login', self.browser.get, f'{self.live_server_url}/login/')
         self.assertIn("WebReestr", self.browser.title)
 
-        login_form = self.browser.find_element(By.TAG_NAME, "form")
-        self.assertIsNotNone(login_form)
-        self.assertIsNotNone(self.browser.find_element(By.NAME, 'username'))
-        self.assertIsNotNone(self.browser.find_element(By.NAME, 'password'))
-        self.assertIsNotNone(self.browser.find_element(By.TAG_NAME, 'button'))
+        self.assertTrue(self.browser.has_element(tag='form'))
+        self.assertTrue(self.browser.has_element(name='username'))
+        self.assertTrue(self.browser.has_element(name='password'))
+        self.assertTrue(self.browser.has_element(tag='button'))
 
+    def test_login_opens_profile(self):
+        url = f'{self.live_server_url}/login/'
+        self.timed('profile', self.browser.login, url, 'visitor', 'visitor-password')
+        self.assertTrue(self.browser.url.endswith('/profile/'))
+        self.assertIn('visitor', self.browser.page_source)
 
-if __name__ == "__main__":
-    unittest.main()
+    def test_wrong_password_stays_on_login(self):
+        self.browser.login(f'{self.live_server_url}/login/', 'visitor', 'wrong-password')
+        self.assertTrue(self.browser.url.endswith('/login/'))
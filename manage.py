@@ -6,7 +6,12 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'record.settings')
+    settings_module = 'record.test_settings' if sys.argv[1:2] == ['test'] else 'record.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    from record import bootprofile
+    bootprofile.enable_from_env()
+
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
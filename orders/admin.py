@@ -1,7 +1,98 @@
-from django.contrib import admin
-from .models import Order, OrderFile, OrderComment
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from record.db import ReportingAdminMixin
+from .models import (ArchivedOrder, ArchivedOrderComment, ArchivedOrderFile, Order, OrderComment,
+                     OrderCommentRead, OrderFile)
+from .numbering import try_parse
+from .transitions import bulk_transition
+
+
+def _transition_action(status, description):
+    """Создает действие админки для массового перевода заказов в статус status."""
+    def action(modeladmin, request, queryset):
+        try:
+            changes = bulk_transition(queryset, status, user=request.user)
+        except ValidationError as exc:
+            modeladmin.message_user(request, '; '.join(exc.messages), messages.ERROR)
+            return
+        modeladmin.message_user(request, f'Статус изменен у заказов: {len(changes)}', messages.SUCCESS)
+
+    action.__name__ = f'mark_{status}'
+    action.short_description = description
+    return action
+
+
+@admin.register(Order)
+class OrderAdmin(ReportingAdminMixin, admin.ModelAdmin):
+    list_display = ('order_number', 'customer', 'status', 'month', 'week')
+    list_filter = ('status',)
+    list_select_related = ('customer',)
+    search_fields = ('order_number', 'customer__name', 'customer__code')
+    actions = [
+        _transition_action('completed', 'Перевести в статус "Готово"'),
+        _transition_action('postponed', 'Перевести в статус "Перенос"'),
+        _transition_action('in_progress', 'Перевести в статус "В работе"'),
+    ]
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Полный номер заказа ищется точным совпадением (по уникальному индексу)
+        вместе с доп. заказами, у которых этот заказ указан родительским (у них
+        собственные номера), остальные запросы - обычным поиском.
+        """
+        number = try_parse(search_term.strip())
+        if number is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(Q(order_number=str(number)) | Q(parent_order__order_number=str(number))), False
 
 
-admin.site.register(Order)
 admin.site.register(OrderFile)
-admin.site.register(OrderComment)
+
+
+@admin.register(OrderComment)
+class OrderCommentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'created_at')
+    # __str__ обращается к user.username и order.order_number
+    list_select_related = ('user', 'order')
+    raw_id_fields = ('order',)
+
+
+@admin.register(OrderCommentRead)
+class OrderCommentReadAdmin(admin.ModelAdmin):
+    list_display = ('order', 'user', 'last_read_at')
+    list_select_related = ('user', 'order')
+    raw_id_fields = ('order',)
+
+
+class ReadOnlyAdminMixin:
+    """Архив доступен в админке только для просмотра."""
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderCommentInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedOrderComment
+    fields = ('username', 'text', 'created_at')
+
+
+class ArchivedOrderFileInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedOrderFile
+    fields = ('file', 'uploaded_at')
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ReadOnlyAdminMixin, ReportingAdminMixin, admin.ModelAdmin):
+    list_display = ('order_number', 'customer_code', 'status', 'start_date', 'archived_at')
+    list_filter = ('order_type', 'sub_order_type')
+    search_fields = ('order_number', 'customer_code', 'customer__name')
+    date_hierarchy = 'start_date'
+    inlines = [ArchivedOrderFileInline, ArchivedOrderCommentInline]
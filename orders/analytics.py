@@ -0,0 +1,184 @@
+"""
+Аналитика рекламаций.
+
+Заказы выгружаются одним запросом в столбцы (массивы NumPy), после чего доли
+рекламаций по технологам, заказчикам, типам заказов и неделям и частые слова
+в причинах рекламаций считаются векторно. Рекламация (доп. заказ с типом РЕК)
+относится к технологу, заказчику и типу родительского заказа, а к неделе -
+по собственной производственной неделе. Неделя группируется вместе с годом
+(ГГГГ-ММ/Н): год берется из номера заказа, а если номер не разбирается - из
+даты начала обработки.
+
+Результат кэшируется в общем кэше (см. CACHES) и сбрасывается при любом
+сохранении или удалении заказа: от заказов зависят и число рекламаций, и
+знаменатель доли (основные заказы). NumPy импортируется только при расчете,
+а не при запуске приложения.
+"""
+import re
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from record.db import reporting
+from .models import Order
+from .numbering import try_parse
+
+RECLAMATION = 'РЕК'
+CACHE_KEY = 'orders:reclamation_stats'
+CACHE_VERSION_KEY = 'orders:reclamation_stats:version'
+CACHE_TIMEOUT = 60 * 60
+DIMENSIONS = {
+    'technologist': 'технологам',
+    'customer': 'заказчикам',
+    'order_type': 'типам заказов',
+    'week': 'неделям',
+}
+NO_VALUE = '-'
+
+_TERM_RE = re.compile(r'\w{3,}')
+STOP_WORDS = frozenset({
+    'для', 'при', 'что', 'как', 'или', 'это', 'без', 'все', 'так', 'уже', 'нет', 'был', 'была', 'были', 'после',
+})
+
+
+def week_key(order_number, start_date, month, week):
+    """Ключ производственной недели с годом: 'ГГГГ-ММ/Н' (год неизвестен - '-')."""
+    number = try_parse(order_number)
+    if number is not None:
+        year = 2000 + number.year
+    else:
+        year = start_date.year if start_date else NO_VALUE
+    return f'{year}-{month:02d}/{week}'
+
+
+def load_columns(queryset=None):
+    """
+    Загружает заказы одним запросом и возвращает словарь столбцов:
+    technologist, customer, order_type, week (строки, см. week_key()), is_reclamation,
+    is_main (булевы) и reason (причины рекламаций, только для рекламаций).
+    """
+    import numpy as np
+
+    queryset = reporting(queryset if queryset is not None else Order.objects.all())
+    rows = queryset.annotate(
+        group_technologist=Coalesce(F('parent_order__technologist__username'), F('technologist__username')),
+        group_customer=Coalesce(F('parent_order__customer__code'), F('customer__code')),
+        group_order_type=Coalesce(F('parent_order__order_type'), F('order_type')),
+    ).values_list('group_technologist', 'group_customer', 'group_order_type', 'order_number', 'start_date',
+                  'month', 'week', 'parent_order_id', 'sub_order_type', 'reclamation_reason')
+
+    technologist, customer, order_type, week, is_main, is_reclamation, reason = [], [], [], [], [], [], []
+    for tech, code, kind, number, start_date, month, week_number, parent_id, sub_type, text in rows.iterator():
+        technologist.append(tech or NO_VALUE)
+        customer.append(code or NO_VALUE)
+        order_type.append(kind or NO_VALUE)
+        week.append(week_key(number, start_date, month, week_number))
+        is_main.append(parent_id is None)
+        is_reclamation.append(sub_type == RECLAMATION)
+        reason.append(text or '')
+
+    is_reclamation = np.array(is_reclamation, dtype=bool)
+    return {
+        'technologist': np.array(technologist, dtype=object),
+        'customer': np.array(customer, dtype=object),
+        'order_type': np.array(order_type, dtype=object),
+        'week': np.array(week, dtype=object),
+        'is_main': np.array(is_main, dtype=bool),
+        'is_reclamation': is_reclamation,
+        'reason': np.array(reason, dtype=object)[is_reclamation],
+    }
+
+
+def group_rates(keys, is_main, is_reclamation):
+    """
+    Считает по каждому значению keys количество основных заказов, рекламаций и их долю.
+    Возвращает список словарей, отсортированный по убыванию доли рекламаций.
+    """
+    import numpy as np
+
+    if not len(keys):
+        return []
+    values, inverse = np.unique(keys.astype(str), return_inverse=True)
+    orders = np.bincount(inverse, weights=is_main, minlength=len(values))
+    reclamations = np.bincount(inverse, weights=is_reclamation, minlength=len(values))
+    rates = np.divide(reclamations, orders, out=np.zeros_like(reclamations), where=orders > 0)
+    order = np.lexsort((-reclamations, -rates))
+    return [
+        {'key': str(values[i]), 'orders': int(orders[i]), 'reclamations': int(reclamations[i]),
+         'rate': round(float(rates[i]), 4)}
+        for i in order
+    ]
+
+
+def top_terms(reasons, top=10):
+    """Возвращает самые частые слова в причинах рекламаций: [{'term', 'count'}]."""
+    import numpy as np
+
+    # Разбиение на слова - один проход регулярного выражения по склеенному тексту
+    # (без цикла по строкам), стоп-слова отбрасываются через np.isin
+    terms = np.array(_TERM_RE.findall(' '.join(reasons).lower()), dtype=str)
+    terms = terms[~np.isin(terms, list(STOP_WORDS))]
+    if not len(terms):
+        return []
+    values, counts = np.unique(terms, return_counts=True)
+    order = np.lexsort((values, -counts))[:top]
+    return [{'term': str(values[i]), 'count': int(counts[i])} for i in order]
+
+
+def compute_reclamation_stats(columns, top=10):
+    """Вычисляет сводку по рекламациям из столбцов load_columns()."""
+    total_orders = int(columns['is_main'].sum())
+    total_reclamations = int(columns['is_reclamation'].sum())
+    stats = {
+        'orders': total_orders,
+        'reclamations': total_reclamations,
+        'rate': round(total_reclamations / total_orders, 4) if total_orders else 0.0,
+        'top_reasons': top_terms(columns['reason'], top=top),
+    }
+    for dimension in DIMENSIONS:
+        stats[f'by_{dimension}'] = group_rates(columns[dimension], columns['is_main'], columns['is_reclamation'])
+    return stats
+
+
+def reclamation_stats(top=10):
+    """Возвращает сводку по рекламациям из кэша, вычисляя ее при необходимости."""
+    version = cache.get_or_set(CACHE_VERSION_KEY, 1, None)
+    key = f'{CACHE_KEY}:{version}:{top}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_reclamation_stats(load_columns(), top=top)
+        cache.set(key, stats, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_reclamation_stats():
+    """Сбрасывает кэшированные сводки по рекламациям (меняет версию ключей кэша)."""
+    # Новая версия - метка времени, а не incr(): incr файлового кэша не атомарен
+    cache.set(CACHE_VERSION_KEY, time.time_ns(), None)
+
+
+def synthetic_columns(count, seed=0):
+    """Генерирует столбцы для count заказов (около 5% рекламаций) - для замеров без базы."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    technologists = np.array([f'tech{i}' for i in range(20)], dtype=object)
+    customers = np.array([f'C{i:03d}' for i in range(300)], dtype=object)
+    order_types = np.array(['Н', 'К', 'ЛК', 'ЭШ', 'П'], dtype=object)
+    weeks = np.array([f'{year}-{month:02d}/{week}' for year in (2024, 2025)
+                      for month in range(1, 13) for week in range(1, 6)], dtype=object)
+    phrases = np.array(['скол на фасаде', 'не та фурнитура', 'ошибка в размерах', 'царапина на стекле',
+                        'не хватает деталей', 'брак кромки', 'ошибка ЧПУ присадки'], dtype=object)
+
+    is_reclamation = rng.random(count) < 0.05
+    return {
+        'technologist': technologists[rng.integers(0, len(technologists), count)],
+        'customer': customers[rng.integers(0, len(customers), count)],
+        'order_type': order_types[rng.integers(0, len(order_types), count)],
+        'week': weeks[rng.integers(0, len(weeks), count)],
+        'is_main': ~is_reclamation,
+        'is_reclamation': is_reclamation,
+        'reason': phrases[rng.integers(0, len(phrases), int(is_reclamation.sum()))],
+    }
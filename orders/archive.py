@@ -0,0 +1,134 @@
+"""
+Архивация завершенных заказов.
+
+Завершенные основные заказы старше заданного срока (по дате начала обработки)
+переносятся вместе с доп. заказами, комментариями и ссылками на файлы в
+архивные таблицы (ArchivedOrder, ArchivedOrderComment, ArchivedOrderFile) и
+удаляются из основных таблиц. Перенос идет пачками, каждая пачка - в своей
+транзакции. Заказ, у которого есть незавершенные доп. заказы, не архивируется.
+Файлы в хранилище не удаляются. Статистика заказчиков (CustomerStats) при
+архивации не меняется: архивные заказы в ней учитываются.
+
+Для заказов без даты начала обработки возраст определяется по году в номере
+заказа: такой заказ архивируется, если его год раньше года даты отсечения.
+"""
+import contextvars
+from datetime import date
+
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import ArchivedOrder, ArchivedOrderComment, ArchivedOrderFile, Order, OrderComment, OrderFile
+from .numbering import try_parse
+
+ARCHIVE_STATUS = 'completed'
+
+_archiving = contextvars.ContextVar('orders_archiving', default=False)
+
+
+def is_archiving():
+    """True, пока archive_batch() удаляет перенесенные в архив заказы из основных таблиц."""
+    return _archiving.get()
+
+
+def months_ago(months, today=None):
+    """Возвращает дату на months месяцев раньше today (день ограничивается 28-м числом)."""
+    today = today or date.today()
+    month_index = today.year * 12 + today.month - 1 - months
+    return date(month_index // 12, month_index % 12 + 1, min(today.day, 28))
+
+
+def undated_orders_before(cutoff):
+    """Id основных завершенных заказов без даты начала, у которых год в номере раньше года cutoff."""
+    rows = Order.objects.filter(parent_order__isnull=True, status=ARCHIVE_STATUS,
+                                start_date__isnull=True).values_list('pk', 'order_number')
+    return [pk for pk, order_number in rows.iterator()
+            if (number := try_parse(order_number)) is not None and 2000 + number.year < cutoff.year]
+
+
+def archivable_orders(cutoff):
+    """
+    Основные завершенные заказы, начатые до cutoff (без даты начала - см.
+    undated_orders_before()), без незавершенных доп. заказов.
+    """
+    open_sub_orders = Order.objects.filter(parent_order=OuterRef('pk')).exclude(status=ARCHIVE_STATUS)
+    return (Order.objects.filter(parent_order__isnull=True, status=ARCHIVE_STATUS)
+            .filter(Q(start_date__lt=cutoff) | Q(pk__in=undated_orders_before(cutoff)))
+            .exclude(Exists(open_sub_orders))
+            .order_by('pk'))
+
+
+def _archive_copy(order):
+    fields = serializers.serialize('python', [order])[0]['fields']
+    number = try_parse(order.order_number)
+    return ArchivedOrder(
+        original_id=order.pk,
+        order_number=order.order_number,
+        customer_id=order.customer_id,
+        # Код из номера: по нему Order.save() ищет занятые номера, даже если код заказчика сменился
+        customer_code=number.client_code if number is not None else order.customer.code or '',
+        parent_original_id=order.parent_order_id,
+        status=order.status,
+        order_type=order.order_type,
+        sub_order_type=order.sub_order_type,
+        month=order.month,
+        week=order.week,
+        start_date=order.start_date,
+        data=fields,
+    )
+
+
+def archive_batch(order_ids):
+    """
+    Переносит в архив заказы order_ids вместе с их доп. заказами в одной транзакции.
+    Возвращает количество перенесенных заказов (включая доп. заказы).
+    """
+    with transaction.atomic():
+        orders = list(Order.objects.filter(Q(pk__in=order_ids) | Q(parent_order__in=order_ids))
+                      .select_related('customer'))
+        if not orders:
+            return 0
+        ids = [order.pk for order in orders]
+
+        archived = ArchivedOrder.objects.bulk_create(_archive_copy(order) for order in orders)
+        archived_by_id = {copy.original_id: copy for copy in archived}
+        if any(copy.pk is None for copy in archived):
+            archived_by_id = {copy.original_id: copy for copy in ArchivedOrder.objects.filter(original_id__in=ids)}
+
+        ArchivedOrderComment.objects.bulk_create(
+            ArchivedOrderComment(order=archived_by_id[comment.order_id], user_id=comment.user_id,
+                                 username=comment.user.username, text=comment.text, created_at=comment.created_at)
+            for comment in OrderComment.objects.filter(order__in=ids).select_related('user')
+        )
+        ArchivedOrderFile.objects.bulk_create(
+            ArchivedOrderFile(order=archived_by_id[order_file.order_id], file=order_file.file.name,
+                              uploaded_at=order_file.uploaded_at)
+            for order_file in OrderFile.objects.filter(order__in=ids)
+        )
+        token = _archiving.set(True)
+        try:
+            Order.objects.filter(pk__in=ids).delete()
+        finally:
+            _archiving.reset(token)
+    return len(ids)
+
+
+def archive_orders(months=12, batch_size=200, today=None, dry_run=False):
+    """
+    Архивирует завершенные заказы старше months месяцев пачками по batch_size основных заказов.
+    Возвращает количество перенесенных (при dry_run - подлежащих переносу основных) заказов.
+    """
+    candidates = archivable_orders(months_ago(months, today))
+    if dry_run:
+        return candidates.count()
+
+    total = 0
+    last_id = 0
+    while True:
+        # Пачки выбираются по возрастанию id, поэтому не повторяются даже при пропусках
+        batch = list(candidates.filter(pk__gt=last_id).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        total += archive_batch(batch)
+        last_id = batch[-1]
@@ -0,0 +1,165 @@
+"""
+Компактный снимок открытых заказов для табло цеха.
+
+Снимок хранит только поля, нужные табло, в записях с __slots__ (строки
+статуса и типа интернированы), обновляется инкрементально по сигналам
+модели Order и отдает заранее сериализованный JSON с ETag. Пока заказы
+не меняются, повторный опрос табло не обращается к базе и не сериализует
+данные заново.
+
+Снимок живет в памяти процесса. Каждое изменение записывает новую версию
+в кэш Django; процесс, увидевший чужую версию, полностью перечитывает снимок.
+Поэтому кэш должен быть общим для процессов (см. CACHES в record.settings:
+Redis или файловый кэш). С кэшем в памяти процесса (LocMemCache) изменения
+из других процессов попадут на табло только через BOARD_SNAPSHOT_MAX_AGE
+секунд, когда снимок перечитывается в любом случае.
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Order
+
+# Битовые флаги материалов
+FLAG_FIELDS = ('has_mdf', 'has_fittings', 'has_glass', 'has_cnc')
+PAYLOAD_FIELDS = ('id', 'order_number', 'status', 'week', 'order_type', 'flags')
+CLOSED_STATUS = 'completed'
+VERSION_CACHE_KEY = 'orders:board:version'
+
+
+def pack_flags(values):
+    """Упаковывает значения флагов материалов (в порядке FLAG_FIELDS) в целое число."""
+    flags = 0
+    for bit, value in enumerate(values):
+        if value:
+            flags |= 1 << bit
+    return flags
+
+
+def _intern(value):
+    return sys.intern(value) if value is not None else None
+
+
+class BoardRecord:
+    """Запись табло об одном открытом заказе."""
+    __slots__ = PAYLOAD_FIELDS
+
+    def __init__(self, id, order_number, status, week, order_type, flags):
+        self.id = id
+        self.order_number = order_number
+        self.status = _intern(status)
+        self.week = week
+        self.order_type = _intern(order_type)
+        self.flags = flags
+
+    @classmethod
+    def from_order(cls, order):
+        return cls(order.pk, order.order_number, order.status, order.week, order.order_type,
+                   pack_flags(getattr(order, field) for field in FLAG_FIELDS))
+
+    def as_row(self):
+        return [self.id, self.order_number, self.status, self.week, self.order_type, self.flags]
+
+
+class BoardSnapshot:
+    """Снимок открытых заказов с кэшированным JSON-представлением."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Сбрасывает снимок; он будет перечитан при следующем запросе."""
+        self._records = {}
+        self._loaded_at = None
+        self._shared_version = None
+        self._payload = None
+        self._etag = None
+
+    def max_age(self):
+        return getattr(settings, 'BOARD_SNAPSHOT_MAX_AGE', 30)
+
+    def _stale(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age():
+            return True
+        return cache.get(VERSION_CACHE_KEY) != self._shared_version
+
+    def load(self):
+        """Полностью перечитывает открытые заказы одним запросом."""
+        rows = (Order.objects.exclude(status=CLOSED_STATUS)
+                .values_list('pk', 'order_number', 'status', 'week', 'order_type', *FLAG_FIELDS))
+        records = {row[0]: BoardRecord(*row[:5], pack_flags(row[5:])) for row in rows.iterator()}
+        with self._lock:
+            self._records = records
+            self._loaded_at = time.monotonic()
+            self._shared_version = cache.get(VERSION_CACHE_KEY)
+            self._payload = None
+
+    def apply(self, order):
+        """Учитывает сохраненный заказ: добавляет/обновляет запись или удаляет закрытый заказ."""
+        if order.status == CLOSED_STATUS:
+            self.remove(order.pk)
+            return
+        record = BoardRecord.from_order(order)
+        with self._lock:
+            if self._loaded_at is not None:
+                self._records[record.id] = record
+                self._payload = None
+        self._publish()
+
+    def apply_status_changes(self, changes):
+        """Учитывает массовую смену статусов (см. orders.transitions)."""
+        with self._lock:
+            if self._loaded_at is not None:
+                for change in changes:
+                    if change.new_status == CLOSED_STATUS:
+                        self._records.pop(change.order_id, None)
+                    elif change.order_id in self._records:
+                        self._records[change.order_id].status = _intern(change.new_status)
+                    else:
+                        # Заказ вернулся из закрытых - данных для записи нет, перечитаем снимок
+                        self._loaded_at = None
+                self._payload = None
+        self._publish()
+
+    def remove(self, order_id):
+        with self._lock:
+            if self._records.pop(order_id, None) is not None:
+                self._payload = None
+        self._publish()
+
+    def _publish(self):
+        """
+        Сообщает другим процессам, что их снимки табло устарели. Свой снимок
+        остается актуальным, только если в кэше была его же версия; иначе
+        он пропустил изменение другого процесса и будет перечитан.
+        """
+        version = time.time_ns()
+        with self._lock:
+            if cache.get(VERSION_CACHE_KEY) != self._shared_version:
+                self._loaded_at = None
+            cache.set(VERSION_CACHE_KEY, version, timeout=None)
+            self._shared_version = version
+
+    def payload(self):
+        """Возвращает кортеж (etag, JSON в байтах), пересериализуя снимок только после изменений."""
+        if self._stale():
+            self.load()
+        with self._lock:
+            if self._payload is None:
+                records = sorted(self._records.values(), key=lambda record: (record.week, record.order_number))
+                self._payload = json.dumps(
+                    {'fields': PAYLOAD_FIELDS, 'flags': FLAG_FIELDS,
+                     'orders': [record.as_row() for record in records]},
+                    ensure_ascii=False, separators=(',', ':'),
+                ).encode('utf-8')
+                self._etag = f'"{hashlib.blake2b(self._payload, digest_size=12).hexdigest()}"'
+            return self._etag, self._payload
+
+
+snapshot = BoardSnapshot()
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from .models import OrderComment, OrderCommentRead
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    """Курсор пагинации не удалось разобрать."""
+
+
+def encode_cursor(comment):
+    """
+    Кодирует позицию комментария в курсор вида '<микросекунды с эпохи>_<id>'.
+    Курсор не содержит символов, требующих экранирования в URL.
+    """
+    delta = comment.created_at - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+    return f"{micros}_{comment.pk}"
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор, возвращая кортеж (created_at, id)."""
+    try:
+        micros, pk = cursor.split('_')
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError) as exc:
+        raise InvalidCursor(f'Некорректный курсор: {cursor}') from exc
+
+
+def comment_page(order, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Возвращает страницу комментариев заказа в порядке (created_at, id).
+
+    Пагинация курсорная (keyset): следующая страница выбирается условием
+    "после последнего показанного комментария", что использует индекс
+    (order, created_at, id) и не требует OFFSET. Возвращает кортеж
+    (список комментариев, курсор следующей страницы или None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    comments = OrderComment.objects.filter(order=order).select_related('user').order_by('created_at', 'id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        comments = comments.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+    page = list(comments[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def mark_comments_read(user, order, until):
+    """
+    Отмечает комментарии заказа прочитанными пользователем до until - времени
+    создания последнего показанного ему комментария. Отметка только
+    сдвигается вперед: запоздавший запрос со старым until ее не откатывает.
+    """
+    marker, created = OrderCommentRead.objects.get_or_create(user=user, order=order,
+                                                             defaults={'last_read_at': until})
+    if not created:
+        OrderCommentRead.objects.filter(pk=marker.pk, last_read_at__lt=until).update(last_read_at=until)
+        marker.refresh_from_db(fields=['last_read_at'])
+    return marker
+
+
+def annotate_unread_comments(orders, user):
+    """
+    Добавляет к queryset заказов поле unread_comments - количество непрочитанных
+    пользователем комментариев других пользователей.
+
+    Считается одним сгруппированным запросом для всего списка заказов.
+    """
+    last_read = OrderCommentRead.objects.filter(order=OuterRef('pk'), user=user).values('last_read_at')[:1]
+    unread = ~Q(comments__user=user) & (
+        Q(last_read_at__isnull=True) | Q(comments__created_at__gt=F('last_read_at'))
+    )
+    return orders.annotate(last_read_at=Subquery(last_read)).annotate(
+        unread_comments=Count('comments', filter=unread))
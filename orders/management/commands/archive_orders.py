@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.archive import archive_orders, months_ago
+
+
+class Command(BaseCommand):
+    help = ('Переносит завершенные заказы старше N месяцев (с доп. заказами, комментариями и ссылками на файлы) '
+            'в архивные таблицы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12,
+                            help='Архивировать заказы, начатые раньше чем N месяцев назад (по умолчанию 12).')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Количество основных заказов в одной транзакции (по умолчанию 200).')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько заказов будет перенесено.')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--months и --batch-size должны быть положительными.')
+
+        count = archive_orders(months=options['months'], batch_size=options['batch_size'],
+                               dry_run=options['dry_run'])
+        cutoff = months_ago(options['months'])
+        if options['dry_run']:
+            self.stdout.write(f'Основных заказов к архивации (начаты до {cutoff}): {count}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Перенесено в архив заказов (начаты до {cutoff}): {count}'))
@@ -0,0 +1,45 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from orders.numbering import format_order_number, parse
+
+
+def legacy_sequence(order_number):
+    """Разбор порядкового номера так, как это делал Order.save() до появления orders.numbering."""
+    return int(order_number.split('-')[-1].split('-')[0][:-1]) + 1 if \
+        order_number.split('-')[-1].split('-')[0][-1].isdigit() else int(order_number.split('-')[-1][:-1]) + 1
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарк разбора и форматирования номеров заказов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=100000, help='Количество повторов (по умолчанию 100000).')
+
+    def handle(self, *args, **options):
+        repeat = options['number']
+        numbers = [format_order_number('РИК', 24, i % 500 + 1, ('Н', 'ЛК', 'ЭШ')[i % 3], (None, 'ДОП', '2')[i % 3])
+                   for i in range(1000)]
+        simple = [number for number in numbers if not number.count('-') > 2]
+
+        def run_parse_uncached():
+            for number in numbers:
+                parse.__wrapped__(number)
+
+        def run_parse_cached():
+            for number in numbers:
+                parse(number)
+
+        def run_legacy():
+            for number in simple:
+                legacy_sequence(number)
+
+        loops = max(1, repeat // len(numbers))
+        results = [
+            ('parse (без кэша)', timeit.timeit(run_parse_uncached, number=loops), len(numbers)),
+            ('parse (с кэшем)', timeit.timeit(run_parse_cached, number=loops), len(numbers)),
+            ('split (старый разбор)', timeit.timeit(run_legacy, number=loops), len(simple)),
+        ]
+        for name, elapsed, per_loop in results:
+            self.stdout.write(f'{name:<24} {elapsed / (loops * per_loop) * 1e9:8.0f} нс/номер')
@@ -0,0 +1,65 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from customers.models import Customer
+from orders.models import Order
+from orders.transitions import bulk_transition
+from users.models import CustomUser
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает массовую смену статусов (bulk_transition) с вызовом Order.save() для каждого заказа. '
+            'Все изменения выполняются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500, help='Количество заказов (по умолчанию 500).')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['orders'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, count):
+        # Уникальные имена: в базе уже могут быть данные (в том числе от прерванного прогона)
+        suffix = uuid.uuid4().hex[:8]
+        manager = CustomUser.objects.create(username=f'bench-transitions-{suffix}')
+        customer = Customer.objects.create(name='Bench', code=f'B{suffix}', manager=manager)
+        orders = Order.objects.bulk_create(
+            Order(customer=customer, order_number=f'B{suffix}-00-{i:05d}Н', order_type='Н', month=1, week=1,
+                  manager=manager, status='in_progress')
+            for i in range(count)
+        )
+        ids = [order.pk for order in orders]
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for order in Order.objects.filter(pk__in=ids):
+                order.status = 'completed'
+                order.save()
+            per_row = time.perf_counter() - started
+        per_row_queries = len(queries)
+
+        Order.objects.filter(pk__in=ids).update(status='in_progress')
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            bulk_transition(ids, 'completed')
+            bulk = time.perf_counter() - started
+        bulk_queries = len(queries)
+
+        self.stdout.write(f'Заказов: {count}')
+        self.stdout.write(f'Order.save():      {per_row * 1000:9.1f} мс, запросов: {per_row_queries}')
+        self.stdout.write(f'bulk_transition(): {bulk * 1000:9.1f} мс, запросов: {bulk_queries}')
+        if bulk:
+            self.stdout.write(self.style.SUCCESS(f'Ускорение: x{per_row / bulk:.1f}'))
@@ -0,0 +1,82 @@
+import json
+import tempfile
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from customers.models import Customer
+from orders.models import Order
+from record.perf import clear_published, merge_reports, published_reports, registry
+from users.models import CustomUser, Department
+from users.views import profile
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Печатает статистику профилирования запросов, опубликованную процессами приложения '
+            '(PERF_DUMP_DIR, см. record.perf).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Вывести отчет в JSON.')
+        parser.add_argument('--reset', action='store_true', help='Удалить опубликованную статистику после вывода.')
+        parser.add_argument('--synthetic', type=int, metavar='ORDERS',
+                            help='Вместо опубликованной статистики выполнить горячие участки (Order.save(), '
+                                 'Customer.clean(), профиль) на ORDERS заказах и вывести их статистику. '
+                                 'Пишет в базу в транзакции, которая откатывается (на SQLite блокирует запись '
+                                 'на время работы), - не запускайте на рабочей базе.')
+
+    def handle(self, *args, **options):
+        if options['synthetic'] is not None:
+            report = self._synthetic(options['synthetic'])
+        else:
+            report = merge_reports(published_reports())
+            if options['reset']:
+                clear_published()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        if 'processes' in report:
+            self.stdout.write(f'Процессов: {len(report["processes"])}')
+        self.stdout.write(f'{"Операция":<22} {"вызовов":>8} {"запросов":>9} {"всего, мс":>10} {"p95, мс":>8} '
+                          f'{"макс., мс":>10}')
+        for item in report['operations']:
+            queries = item['queries']
+            self.stdout.write(f'{item["operation"]:<22} {item["calls"]["count"]:>8} {queries["count"]:>9} '
+                              f'{queries["total_ms"]:>10.2f} {queries["p95_ms"]:>8.2f} {queries["max_ms"]:>10.2f}')
+        self.stdout.write(f'Медленных запросов: {len(report["slow_queries"])}')
+
+    def _synthetic(self, count):
+        registry.reset()
+        # Статистика синтетического прогона не смешивается с опубликованной процессами приложения
+        with tempfile.TemporaryDirectory() as dump_dir, override_settings(PERF_PROFILING=True,
+                                                                           PERF_DUMP_DIR=dump_dir):
+            try:
+                with transaction.atomic():
+                    self._run(count)
+                    raise _Rollback
+            except _Rollback:
+                pass
+            report = registry.report()
+        registry.reset()
+        return report
+
+    def _run(self, count):
+        suffix = uuid.uuid4().hex[:8]
+        department, _ = Department.objects.get_or_create(name='коммерческий')
+        manager = CustomUser.objects.create(username=f'perf-dump-{suffix}', department=department)
+        customer = Customer(name='Perf', code=f'P{suffix}', manager=manager)
+        customer.full_clean()
+        customer.save()
+        for i in range(count):
+            Order.objects.create(customer=customer, order_type='Н', month=1, week=i % 5 + 1, manager=manager)
+
+        request = RequestFactory().get('/profile/')
+        request.user = manager
+        profile(request)
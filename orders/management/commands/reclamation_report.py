@@ -0,0 +1,44 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.analytics import DIMENSIONS, compute_reclamation_stats, load_columns, synthetic_columns
+
+
+class Command(BaseCommand):
+    help = 'Выводит сводку по рекламациям: доли по технологам, заказчикам, типам и неделям и частые причины.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Сколько строк выводить в каждом разрезе.')
+        parser.add_argument('--json', action='store_true', help='Вывести полную сводку в JSON.')
+        parser.add_argument('--synthetic', type=int, metavar='N',
+                            help='Посчитать на N сгенерированных заказах (замер времени без базы).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['synthetic']:
+            columns = synthetic_columns(options['synthetic'])
+        else:
+            columns = load_columns()
+        loaded = time.perf_counter()
+        stats = compute_reclamation_stats(columns, top=options['top'])
+        computed = time.perf_counter()
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2))
+        else:
+            self._print_summary(stats, options['top'])
+        self.stderr.write(f'Заказов: {len(columns["is_main"])}; загрузка {(loaded - started) * 1000:.1f} мс, '
+                          f'расчет {(computed - loaded) * 1000:.1f} мс')
+
+    def _print_summary(self, stats, top):
+        self.stdout.write(f'Основных заказов: {stats["orders"]}, рекламаций: {stats["reclamations"]}, '
+                          f'доля: {stats["rate"]:.2%}')
+        for dimension, title in DIMENSIONS.items():
+            self.stdout.write(f'\nПо {title}:')
+            for row in stats[f'by_{dimension}'][:top]:
+                self.stdout.write(f'  {row["key"]:<20} {row["reclamations"]:>6} / {row["orders"]:<6} {row["rate"]:.2%}')
+        self.stdout.write('\nЧастые причины:')
+        for row in stats['top_reasons']:
+            self.stdout.write(f'  {row["term"]:<20} {row["count"]}')
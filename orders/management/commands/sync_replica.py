@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в файл реплики (локальная имитация репликации). '
+            'С --interval работает как периодическое задание.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять копирование каждые N секунд (по умолчанию - один раз).')
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if alias is None:
+            raise CommandError('Реплика не настроена: задайте переменную окружения WEBREESTR_REPLICA_DB.')
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        target = settings.DATABASES[alias]
+        if 'sqlite3' not in source['ENGINE'] or 'sqlite3' not in target['ENGINE']:
+            raise CommandError('Копирование поддерживается только для SQLite.')
+
+        while True:
+            started = time.perf_counter()
+            self.copy(str(source['NAME']), str(target['NAME']))
+            self.stdout.write(f'Реплика обновлена за {(time.perf_counter() - started) * 1000:.1f} мс')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def copy(source_path, target_path):
+        """
+        Копирует базу через SQLite backup API во временный файл и атомарно
+        подменяет им реплику, чтобы читатели не увидели частично записанный файл.
+        """
+        tmp_path = f'{target_path}.tmp'
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        os.replace(tmp_path, target_path)
@@ -1,8 +1,12 @@
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from users.models import CustomUser
 from customers.models import Customer
+from customers.stats import ORDER_FIELDS, apply_order_change
 from datetime import datetime
+from record.perf import operation
+from .numbering import format_order_number, try_parse, year_prefix
 
 
 class Order(models.Model):
@@ -19,6 +23,16 @@ class Order(models.Model):
         ('completed', 'Готово'),
     ]
 
+    # Допустимые переходы между статусами (используются при массовой смене статуса)
+    STATUS_TRANSITIONS = {
+        'accepted': ('in_progress', 'clarification', 'postponed'),
+        'in_progress': ('clarification', 'documents', 'postponed', 'completed'),
+        'clarification': ('in_progress', 'postponed'),
+        'documents': ('in_progress', 'completed'),
+        'postponed': ('accepted', 'in_progress', 'completed'),
+        'completed': (),
+    }
+
     ORDER_TYPES = [
         ('Н', '(Н)Нестандартные заказы'),
         ('К', '(К)Нестандартные заказы кухни'),
@@ -85,35 +99,55 @@ class Order(models.Model):
         if self.week and self.week > 5:
             raise ValidationError({'week': 'Неделя не может быть больше 5'})
 
+    @operation('order.save')
     def save(self, *args, **kwargs):
         """
         Переопределяем метод save для генерации номера заказа.
+
+        Запись заказа и обновление статистики заказчика (CustomerStats) выполняются
+        в одной транзакции; прежние значения берутся из строки заказа с блокировкой.
         """
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Order.objects.select_for_update().filter(pk=self.pk).values(*ORDER_FIELDS).first()
+            self._save_order(*args, **kwargs)
+
+            update_fields = kwargs.get('update_fields')
+            current = {field: getattr(self, field) for field in ORDER_FIELDS
+                       if previous is None or update_fields is None or field in update_fields
+                       or field.removesuffix('_id') in update_fields}
+            apply_order_change(previous, {**(previous or {}), **current})
+
+    def _save_order(self, *args, **kwargs):
         if not self.pk:  # Только для новых заказов
             year = datetime.now().year % 100  # Берем последние две цифры года
-            client_code = self.customer.code
-            order_type = self.order_type
-
-            # Получаем порядковый номер
-            last_order = Order.objects.filter(customer=self.customer,
-                                              order_number__startswith=f'{client_code}-{year}').order_by(
-                '-order_number').first()
-            order_number_part = 0
-            if last_order:
-                order_number_part = int(last_order.order_number.split('-')[-1].split('-')[0][:-1]) + 1 if \
-                last_order.order_number.split('-')[-1].split('-')[0][-1].isdigit() else int(
-                    last_order.order_number.split('-')[-1][:-1]) + 1
-            else:
-                order_number_part = 1
 
-            order_number_base = f"{client_code}-{year}-{order_number_part:03d}{order_type}"
+            with operation('order.number_alloc'):
+                client_code = self.customer.code
+                # Получаем порядковый номер: следующий после наибольшего номера заказчика за год.
+                # Максимум берется по разобранному порядковому номеру, а не по строке
+                # ('999Н' > '1000Н'). Номера архивных заказов тоже заняты - иначе номер
+                # выдавался бы повторно. Архив растет без ограничений, поэтому он сужается
+                # по индексу customer_code (LIKE по префиксу индекс номера не использует).
+                prefix = year_prefix(client_code, year)
+                sequences = [
+                    number.sequence
+                    for numbers in (Order.objects.filter(customer=self.customer, order_number__startswith=prefix),
+                                    ArchivedOrder.objects.filter(customer_code=client_code,
+                                                                 order_number__startswith=prefix))
+                    for number in map(try_parse, numbers.values_list('order_number', flat=True).iterator())
+                    if number is not None
+                ]
+            order_number_part = max(sequences, default=0) + 1
 
             if self.sub_order_type:
-                self.order_number = f"{order_number_base}-{self.sub_order_type}"
+                suffix = self.sub_order_type
             elif self.part:
-                self.order_number = f"{order_number_base}-{self.part}"
+                suffix = self.part
             else:
-                self.order_number = order_number_base
+                suffix = None
+            self.order_number = format_order_number(client_code, year, order_number_part, self.order_type, suffix)
         if not self.pk and not self.order_type:
             raise ValueError("Для основных заказов необходимо указать тип заказа.")
 
@@ -156,9 +190,130 @@ class OrderComment(models.Model):
     text = models.TextField(verbose_name='Комментарий')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
+    class Meta:
+        indexes = [
+            # Лента комментариев заказа и курсорная пагинация по (created_at, id)
+            models.Index(fields=['order', 'created_at', 'id'], name='orders_comment_thread_idx'),
+        ]
+
     def __str__(self):
         """
         Возвращает строковое представление объекта комментария.
         Используется для отображения в админке.
         """
-        return f"Comment by {self.user.username} on {self.order.order_number}"
\ No newline at end of file
+        return f"Comment by {self.user.username} on {self.order.order_number}"
+
+
+class OrderCommentRead(models.Model):
+    """
+    Отметка о прочтении комментариев заказа пользователем.
+
+    Атрибуты:
+        order (ForeignKey): Связь с моделью Order.
+        user (ForeignKey): Связь с моделью CustomUser.
+        last_read_at (DateTimeField): Время создания последнего прочитанного комментария.
+                                      Более поздние комментарии считаются непрочитанными.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='comment_reads', verbose_name='Заказ')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='comment_reads',
+                             verbose_name='Пользователь')
+    last_read_at = models.DateTimeField(verbose_name='Прочитано до')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'order'], name='orders_comment_read_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление отметки о прочтении.
+        Используется для отображения в админке.
+        """
+        return f"Read by {self.user_id} on {self.order_id} at {self.last_read_at:%Y-%m-%d %H:%M}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Архивная копия завершенного заказа (см. команду archive_orders).
+
+    Поля для поиска и отображения вынесены в отдельные столбцы, полная запись
+    заказа хранится в data. Архив доступен только для чтения.
+
+    Атрибуты:
+        original_id (BigIntegerField): id заказа в основной таблице.
+        order_number (CharField): Номер заказа.
+        customer (ForeignKey): Связь с моделью Customer. Может быть пустым.
+        customer_code (CharField): Код заказчика из номера заказа (если номер не разбирается - код
+            на момент архивации). Индексирован: по нему ищутся занятые номера при создании заказа.
+        parent_original_id (BigIntegerField): id родительского заказа. Может быть пустым.
+        status, order_type, sub_order_type, month, week, start_date: Копии полей заказа.
+        data (JSONField): Все поля заказа.
+        archived_at (DateTimeField): Дата и время архивации.
+    """
+    original_id = models.BigIntegerField(unique=True, verbose_name='Исходный id')
+    order_number = models.CharField(max_length=50, unique=True, verbose_name='Номер заказа')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='archived_orders', verbose_name='Заказчик')
+    customer_code = models.CharField(max_length=10, blank=True, db_index=True, verbose_name='Код заказчика')
+    parent_original_id = models.BigIntegerField(null=True, blank=True, verbose_name='Родительский заказ')
+    status = models.CharField(max_length=50, choices=Order.STATUS_CHOICES, verbose_name='Статус заказа')
+    order_type = models.CharField(max_length=3, choices=Order.ORDER_TYPES, null=True, blank=True,
+                                  verbose_name='Тип заказа')
+    sub_order_type = models.CharField(max_length=3, choices=Order.SUB_ORDER_TYPES, null=True, blank=True,
+                                      verbose_name='Тип доп. заказа')
+    month = models.IntegerField(verbose_name='Месяц заказа')
+    week = models.IntegerField(verbose_name='Производственная неделя')
+    start_date = models.DateField(null=True, blank=True, db_index=True, verbose_name='Дата начала обработки')
+    data = models.JSONField(encoder=DjangoJSONEncoder, verbose_name='Данные заказа')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архив заказов'
+
+    def __str__(self):
+        """
+        Возвращает строковое представление архивного заказа.
+        Используется для отображения в админке.
+        """
+        return f"{self.order_number} (архив)"
+
+
+class ArchivedOrderFile(models.Model):
+    """
+    Ссылка на файл архивного заказа. Сам файл остается в хранилище.
+
+    Атрибуты:
+        order (ForeignKey): Связь с моделью ArchivedOrder.
+        file (CharField): Путь к файлу в хранилище.
+        uploaded_at (DateTimeField): Дата и время загрузки файла.
+    """
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='files', verbose_name='Заказ')
+    file = models.CharField(max_length=255, verbose_name='Файл')
+    uploaded_at = models.DateTimeField(verbose_name='Дата загрузки')
+
+    def __str__(self):
+        return f"File for {self.order_id}: {self.file}"
+
+
+class ArchivedOrderComment(models.Model):
+    """
+    Комментарий архивного заказа.
+
+    Атрибуты:
+        order (ForeignKey): Связь с моделью ArchivedOrder.
+        user (ForeignKey): Связь с моделью CustomUser. Может быть пустым.
+        username (CharField): Имя автора на момент архивации.
+        text (TextField): Текст комментария.
+        created_at (DateTimeField): Дата и время создания комментария.
+    """
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='comments',
+                              verbose_name='Заказ')
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True,
+                             verbose_name='Пользователь')
+    username = models.CharField(max_length=150, blank=True, verbose_name='Автор')
+    text = models.TextField(verbose_name='Комментарий')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+
+    def __str__(self):
+        return f"Comment by {self.username} on {self.order_id}"
@@ -0,0 +1,84 @@
+"""
+Кодек номеров заказов.
+
+Формат номера: <код заказчика>-<год, 2 цифры>-<порядковый номер, от 3 цифр><тип заказа>[-<суффикс>],
+где суффикс - тип доп. заказа (ДОП, РЕК, ДОД) или номер части заказа.
+Примеры: РИК-24-012Н-ДОП, РИК-24-012ЛК-2, РИК-24-013ЭШ.
+
+Разбор выполняется одним заранее скомпилированным регулярным выражением,
+результаты разбора и форматирования кэшируются.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Должны совпадать с Order.ORDER_TYPES и Order.SUB_ORDER_TYPES (проверяется тестами).
+# Двухбуквенные типы стоят первыми, чтобы "ЛК" не разбиралось как "К".
+ORDER_TYPE_CODES = ('ЛК', 'ЭШ', 'Н', 'К', 'П')
+SUB_ORDER_CODES = ('ДОП', 'РЕК', 'ДОД')
+
+ORDER_NUMBER_RE = re.compile(
+    r'^(?P<client_code>.+?)-(?P<year>\d{2})-(?P<sequence>\d{3,})'
+    r'(?P<order_type>%s)(?:-(?P<suffix>%s|\d+))?$' % ('|'.join(ORDER_TYPE_CODES), '|'.join(SUB_ORDER_CODES))
+)
+
+
+class InvalidOrderNumber(ValueError):
+    """Строка не является номером заказа."""
+
+
+class OrderNumber(NamedTuple):
+    """Разобранный номер заказа."""
+    client_code: str
+    year: int
+    sequence: int
+    order_type: str
+    suffix: Optional[str] = None
+
+    @property
+    def sub_order_type(self):
+        """Тип доп. заказа или None."""
+        return self.suffix if self.suffix in SUB_ORDER_CODES else None
+
+    @property
+    def part(self):
+        """Номер части заказа или None."""
+        return int(self.suffix) if self.suffix and self.suffix.isdigit() else None
+
+    @property
+    def base(self):
+        """Номер без суффикса (номер основного заказа)."""
+        return format_order_number(self.client_code, self.year, self.sequence, self.order_type)
+
+    def __str__(self):
+        return format_order_number(*self)
+
+
+@lru_cache(maxsize=4096)
+def parse(order_number):
+    """Разбирает номер заказа в OrderNumber. Выбрасывает InvalidOrderNumber для некорректных строк."""
+    match = ORDER_NUMBER_RE.match(order_number)
+    if match is None:
+        raise InvalidOrderNumber(f'Некорректный номер заказа: {order_number}')
+    client_code, year, sequence, order_type, suffix = match.groups()
+    return OrderNumber(client_code, int(year), int(sequence), order_type, suffix)
+
+
+def try_parse(order_number):
+    """Как parse(), но возвращает None для некорректных строк."""
+    try:
+        return parse(order_number)
+    except InvalidOrderNumber:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def format_order_number(client_code, year, sequence, order_type, suffix=None):
+    """Собирает номер заказа из частей; year может быть полным (2024) или двузначным (24)."""
+    number = f'{client_code}-{year % 100:02d}-{sequence:03d}{order_type}'
+    return f'{number}-{suffix}' if suffix else number
+
+
+def year_prefix(client_code, year):
+    """Префикс номеров заказов заказчика за год - для поиска последнего номера."""
+    return f'{client_code}-{year % 100:02d}-'
@@ -0,0 +1,79 @@
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from customers.stats import ORDER_FIELDS, apply_order_change, apply_order_delta, is_open
+from .analytics import invalidate_reclamation_stats
+from .archive import is_archiving
+from .board import snapshot as board_snapshot
+from .models import Order
+
+audit_logger = logging.getLogger('orders.audit')
+
+# Массовая смена статусов (orders.transitions). Аргументы: changes - список
+# StatusChange(order_id, customer_id, old_status, new_status), user - инициатор или None.
+orders_status_changed = Signal()
+
+
+@receiver(post_delete, sender=Order)
+def update_customer_stats_on_delete(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики статистики заказчика при удалении заказа.
+
+    post_delete отправляется внутри транзакции удаления (в том числе при
+    удалении через QuerySet и каскадном удалении заказчика). Перенос в архив
+    (orders.archive) статистику не меняет.
+    """
+    if is_archiving():
+        return
+    apply_order_change({field: getattr(instance, field) for field in ORDER_FIELDS}, None)
+
+
+@receiver(orders_status_changed)
+def update_customer_stats_on_bulk_transition(sender, changes, **kwargs):
+    """Обновляет количество открытых заказов заказчиков одним UPDATE на заказчика."""
+    deltas = Counter()
+    for change in changes:
+        deltas[change.customer_id] += is_open(change.new_status) - is_open(change.old_status)
+    for customer_id, delta in deltas.items():
+        apply_order_delta(customer_id, open_orders=delta)
+
+
+@receiver(orders_status_changed)
+def log_bulk_transition(sender, changes, user=None, **kwargs):
+    """Записывает массовую смену статусов в журнал аудита."""
+    audit_logger.info(
+        'Смена статуса %d заказов пользователем %s: %s', len(changes), user or '-',
+        ', '.join(f'{change.order_id}:{change.old_status}->{change.new_status}' for change in changes),
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_board_on_save(sender, instance, **kwargs):
+    """Обновляет снимок табло цеха после фиксации транзакции."""
+    transaction.on_commit(lambda: board_snapshot.apply(instance))
+
+
+@receiver(post_delete, sender=Order)
+def update_board_on_delete(sender, instance, **kwargs):
+    order_id = instance.pk
+    transaction.on_commit(lambda: board_snapshot.remove(order_id))
+
+
+@receiver(orders_status_changed)
+def update_board_on_bulk_transition(sender, changes, **kwargs):
+    transaction.on_commit(lambda: board_snapshot.apply_status_changes(changes))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_reclamation_stats_on_change(sender, **kwargs):
+    """
+    Сбрасывает кэш аналитики рекламаций после фиксации транзакции при любом
+    сохранении или удалении заказа (новые основные заказы меняют знаменатель доли,
+    правка sub_order_type или родителя - состав рекламаций).
+    """
+    transaction.on_commit(invalidate_reclamation_stats)
@@ -1,23 +1,35 @@
+import json
+import random
+import tempfile
+from importlib.util import find_spec
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.exceptions import ValidationError
-from datetime import date, datetime
-from .models import Order, OrderFile, OrderComment
-from users.models import Department, CustomUser
-from customers.models import Customer
-
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, datetime, timedelta
+from .archive import archive_orders
+from .analytics import load_columns, reclamation_stats, top_terms
+from .board import BoardSnapshot, snapshot as board_snapshot
+from .comments import annotate_unread_comments, comment_page, mark_comments_read
+from .numbering import (ORDER_TYPE_CODES, SUB_ORDER_CODES, InvalidOrderNumber, OrderNumber,
+                        format_order_number, parse)
+from .models import ArchivedOrder, Order, OrderFile, OrderComment
+from .signals import orders_status_changed
+from .transitions import bulk_transition
+from customers.models import CustomerStats
+from customers.stats import reconcile_customer_stats
+from record.testing import SharedFixturesMixin, make_customer, make_order, make_user
 
-class OrderModelTest(TestCase):
-    def setUp(self):
-        self.commercial_department = Department.objects.create(name="Коммерческий")
-        self.design_department = Department.objects.create(name="Конструкторский")
-        self.manager = CustomUser.objects.create_user(username='manager', password='password',
-                                                      department=self.commercial_department)
-        self.technologist = CustomUser.objects.create_user(username='technologist', password='password',
-                                                           department=self.design_department)
-        self.customer = Customer.objects.create(name="ООО 'Рога и Копыта'", city="Москва", code="РИК",
-                                                manager=self.manager)
 
+class OrderModelTest(SharedFixturesMixin, TestCase):
     def test_order_creation_with_number_generation(self):
         """Проверяет создание заказа с автоматической генерацией номера."""
         original_year = datetime.now().year
@@ -151,6 +163,15 @@ class OrderModelTest(TestCase):
             )
         self.assertEqual(str(context.exception), "Для основных заказов необходимо указать тип заказа.")
 
+    def test_order_number_sequence_after_two_letter_type_and_sub_order(self):
+        """Проверяет нумерацию после заказов с двухбуквенным типом и доп. заказов."""
+        first = make_order(self.customer, order_type='ЛК')
+        make_order(self.customer, order_type='Н', parent_order=first, sub_order_type='РЕК')
+        third = make_order(self.customer, order_type='ЭШ', part=2)
+        fourth = make_order(self.customer, order_type='П')
+        self.assertEqual([parse(order.order_number).sequence for order in (first, third, fourth)], [1, 3, 4])
+        self.assertEqual(parse(third.order_number).part, 2)
+
     def test_order_week_validation(self):
         """Проверяет, что неделя не может быть больше 5."""
         order = Order(
@@ -168,26 +189,11 @@ class OrderModelTest(TestCase):
         self.assertEqual(str(context.exception.message_dict['week'][0]), 'Неделя не может быть больше 5')
 
 
-class OrderFileModelTest(TestCase):
-    def setUp(self):
-        self.commercial_department = Department.objects.create(name="Коммерческий")
-        self.design_department = Department.objects.create(name="Конструкторский")
-        self.manager = CustomUser.objects.create_user(username='manager', password='password',
-                                                      department=self.commercial_department)
-        self.technologist = CustomUser.objects.create_user(username='technologist', password='password',
-                                                           department=self.design_department)
-        self.customer = Customer.objects.create(name="ООО 'Рога и Копыта'", city="Москва", code="РИК",
-                                                manager=self.manager)
-        self.order = Order.objects.create(
-            customer=self.customer,
-            month=10,
-            week=4,
-            manager=self.manager,
-            start_date=date(2023, 10, 1),
-            technologist=self.technologist,
-            order_type='Н',
-            status='accepted'
-        )
+class OrderFileModelTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = make_order(cls.customer, start_date=date(2023, 10, 1), technologist=cls.technologist)
 
     def test_file_upload(self):
         """Проверяет создание файла для заказа."""
@@ -203,26 +209,11 @@ class OrderFileModelTest(TestCase):
             order_file.file.delete()
 
 
-class OrderCommentModelTest(TestCase):
-    def setUp(self):
-        self.commercial_department = Department.objects.create(name="Коммерческий")
-        self.design_department = Department.objects.create(name="Конструкторский")
-        self.manager = CustomUser.objects.create_user(username='manager', password='password',
-                                                      department=self.commercial_department)
-        self.technologist = CustomUser.objects.create_user(username='technologist', password='password',
-                                                           department=self.design_department)
-        self.customer = Customer.objects.create(name="ООО 'Рога и Копыта'", city="Москва", code="РИК",
-                                                manager=self.manager)
-        self.order = Order.objects.create(
-            customer=self.customer,
-            month=10,
-            week=4,
-            manager=self.manager,
-            start_date=date(2023, 10, 1),
-            technologist=self.technologist,
-            order_type='Н',
-            status='accepted'
-        )
+class OrderCommentModelTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = make_order(cls.customer, start_date=date(2023, 10, 1), technologist=cls.technologist)
 
     def test_comment_creation(self):
         """Проверяет создание комментария к заказу."""
@@ -232,3 +223,456 @@ class OrderCommentModelTest(TestCase):
         self.assertEqual(comment.text, "test comment")
         self.assertTrue(comment.created_at)
         self.assertEqual(str(comment), f"Comment by manager on {self.order.order_number}")
+
+
+class OrderCommentThreadTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = make_order(cls.customer, technologist=cls.technologist)
+        cls.other_order = make_order(cls.customer, technologist=cls.technologist)
+        base = timezone.now() - timedelta(hours=1)
+        cls.comments = []
+        for i in range(5):
+            comment = OrderComment.objects.create(order=cls.order, user=cls.manager, text=f"comment {i}")
+            # Два комментария с одинаковым временем проверяют разрешение по id
+            OrderComment.objects.filter(pk=comment.pk).update(created_at=base + timedelta(minutes=i // 2))
+            comment.refresh_from_db()
+            cls.comments.append(comment)
+
+    def test_comment_page_keyset(self):
+        """Проверяет курсорную пагинацию без пропусков и повторов."""
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = comment_page(self.order, cursor=cursor, limit=2)
+            seen.extend(comment.pk for comment in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [comment.pk for comment in self.comments])
+
+    def test_comments_api_query_count(self):
+        """Проверяет, что API комментариев не делает запрос на каждого автора."""
+        self.client.force_login(self.technologist)
+        url = reverse('order_comments', args=[self.order.pk])
+        self.client.get(url)  # прогрев сессии
+        with self.assertNumQueries(4):  # сессия, пользователь, заказ, комментарии
+            response = self.client.get(url, {'limit': 3})
+        data = response.json()
+        self.assertEqual([item['text'] for item in data['results']], ['comment 0', 'comment 1', 'comment 2'])
+        self.assertEqual(data['results'][0]['user'], 'manager')
+
+        response = self.client.get(url, {'cursor': data['next_cursor']})
+        self.assertEqual([item['text'] for item in response.json()['results']], ['comment 3', 'comment 4'])
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_comments_api_invalid_cursor(self):
+        """Проверяет ответ 400 на некорректный курсор."""
+        self.client.force_login(self.technologist)
+        response = self.client.get(reverse('order_comments', args=[self.order.pk]), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unread_counts_single_query(self):
+        """Проверяет подсчет непрочитанных комментариев по списку заказов одним запросом."""
+        OrderComment.objects.create(order=self.other_order, user=self.technologist, text="own comment")
+        with self.assertNumQueries(1):
+            counts = {order.pk: order.unread_comments
+                      for order in annotate_unread_comments(Order.objects.all(), self.technologist)}
+        self.assertEqual(counts, {self.order.pk: 5, self.other_order.pk: 0})
+
+        mark_comments_read(self.technologist, self.order, until=self.comments[1].created_at)
+        order = annotate_unread_comments(Order.objects.filter(pk=self.order.pk), self.technologist).get()
+        self.assertEqual(order.unread_comments, 3)
+
+    def unread(self):
+        return annotate_unread_comments(Order.objects.filter(pk=self.order.pk), self.technologist).get().unread_comments
+
+    def test_mark_read_endpoint(self):
+        """Проверяет, что отмечаются прочитанными только показанные комментарии."""
+        self.client.force_login(self.technologist)
+        shown = self.client.get(reverse('order_comments', args=[self.order.pk])).json()['results']
+        # Комментарий, пришедший между показом и отметкой, остается непрочитанным
+        OrderComment.objects.create(order=self.order, user=self.manager, text="new comment")
+        response = self.client.post(reverse('order_comments_read', args=[self.order.pk]),
+                                    {'cursor': shown[-1]['cursor']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unread(), 1)
+
+        response = self.client.post(reverse('order_comments_read', args=[self.order.pk]), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_mark_read_never_moves_back(self):
+        """Проверяет, что запоздавшая отметка со старым курсором не возвращает прочитанное в непрочитанные."""
+        mark_comments_read(self.technologist, self.order, until=self.comments[-1].created_at)
+        marker = mark_comments_read(self.technologist, self.order, until=self.comments[0].created_at)
+        self.assertEqual(marker.last_read_at, self.comments[-1].created_at)
+        self.assertEqual(self.unread(), 0)
+
+
+class BulkTransitionTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.orders = [make_order(cls.customer, status='in_progress') for _ in range(3)]
+        cls.ids = [order.pk for order in cls.orders]
+
+    def test_bulk_transition_single_update(self):
+        """Проверяет смену статуса одним UPDATE и одним сигналом."""
+        events = []
+
+        def handler(sender, changes, **kwargs):
+            events.append(changes)
+
+        orders_status_changed.connect(handler)
+        self.addCleanup(orders_status_changed.disconnect, handler)
+        # SELECT заказов, UPDATE заказов, UPDATE статистики заказчика и две пары SAVEPOINT/RELEASE
+        with self.assertNumQueries(7):
+            changes = bulk_transition(self.ids, 'completed')
+        self.assertEqual(len(changes), 3)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(CustomerStats.objects.get(customer=self.customer).open_order_count, 0)
+
+    def test_bulk_transition_rejects_invalid(self):
+        """Проверяет, что недопустимый переход отклоняет всю операцию."""
+        Order.objects.filter(pk=self.ids[0]).update(status='completed')
+        with self.assertRaises(ValidationError):
+            bulk_transition(self.ids, 'clarification')
+        self.assertEqual(Order.objects.filter(status='clarification').count(), 0)
+
+    def test_bulk_transition_non_strict_skips_invalid(self):
+        """Проверяет пропуск недопустимых переходов при strict=False."""
+        Order.objects.filter(pk=self.ids[0]).update(status='completed')
+        changes = bulk_transition(Order.objects.all(), 'postponed', strict=False)
+        self.assertEqual({change.order_id for change in changes}, set(self.ids[1:]))
+        self.assertEqual(Order.objects.get(pk=self.ids[0]).status, 'completed')
+
+
+class BoardSnapshotTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = make_order(cls.customer, week=2, has_mdf=True, has_cnc=True)
+        cls.done = make_order(cls.customer, week=1, status='completed')
+
+    def setUp(self):
+        board_snapshot.clear()
+        self.addCleanup(board_snapshot.clear)
+
+    def rows(self):
+        return json.loads(board_snapshot.payload()[1])['orders']
+
+    def test_snapshot_contains_open_orders(self):
+        """Проверяет состав и компактный формат строк табло."""
+        self.assertEqual(self.rows(), [[self.order.pk, self.order.order_number, 'accepted', 2, 'Н', 0b1001]])
+
+    def test_board_view_not_modified(self):
+        """Проверяет ответ 304 без запросов к заказам при неизменных данных."""
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('order_board'))
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):  # сессия и пользователь
+            response = self.client.get(reverse('order_board'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_incremental_updates(self):
+        """Проверяет обновление снимка по сигналам без перечитывания заказов."""
+        etag, _ = board_snapshot.payload()
+        with self.captureOnCommitCallbacks(execute=True):
+            new_order = make_order(self.customer, week=3)
+        with self.assertNumQueries(0):
+            rows = self.rows()
+        self.assertEqual([row[0] for row in rows], [self.order.pk, new_order.pk])
+        self.assertNotEqual(board_snapshot.payload()[0], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition([self.order.pk], 'postponed')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rows()[0][2], 'postponed')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition([self.order.pk], 'completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            new_order.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rows(), [])
+
+    def test_other_process_sees_change_through_shared_cache(self):
+        """Проверяет, что снимок другого процесса перечитывается по версии в общем (файловом) кэше."""
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}):
+            other_process = BoardSnapshot()
+            other_process.payload()
+            with self.captureOnCommitCallbacks(execute=True):
+                new_order = make_order(self.customer, week=3)
+            rows = json.loads(other_process.payload()[1])['orders']
+        self.assertIn(new_order.pk, [row[0] for row in rows])
+
+    def test_own_change_does_not_hide_other_process_change(self):
+        """Проверяет, что снимок, изменившийся после чужой публикации, перечитывает чужое изменение."""
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}):
+            first, second = BoardSnapshot(), BoardSnapshot()
+            first.payload()
+            second.payload()
+            Order.objects.filter(pk=self.order.pk).update(status='postponed')
+            second.apply(Order.objects.get(pk=self.order.pk))
+            first.apply(make_order(self.customer, week=3))
+            rows = json.loads(first.payload()[1])['orders']
+        self.assertEqual({row[0]: row[2] for row in rows}[self.order.pk], 'postponed')
+
+
+@skipUnless(find_spec('numpy'), 'NumPy не установлен')
+class ReclamationAnalyticsTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.parents = [make_order(cls.customer, technologist=cls.technologist, order_type='Н') for _ in range(4)]
+        make_order(cls.customer, order_type='К')
+        sub_orders = [(cls.parents[0], 'РЕК', "Скол на фасаде"), (cls.parents[1], 'РЕК', "скол кромки"),
+                      (cls.parents[0], 'ДОП', None)]
+        Order.objects.bulk_create(
+            Order(customer=cls.customer, manager=cls.manager, month=10, week=4, order_type='К',
+                  order_number=f'{parent.order_number}-{kind}', parent_order=parent, sub_order_type=kind,
+                  reclamation_reason=reason)
+            for parent, kind, reason in sub_orders
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_columns_single_query(self):
+        """Проверяет выгрузку столбцов одним запросом."""
+        with self.assertNumQueries(1):
+            columns = load_columns()
+        self.assertEqual(int(columns['is_main'].sum()), 5)
+        self.assertEqual(int(columns['is_reclamation'].sum()), 2)
+
+    def test_rates_and_reasons(self):
+        """Проверяет доли рекламаций по разрезам и частые причины."""
+        stats = reclamation_stats()
+        self.assertEqual(stats['reclamations'], 2)
+        self.assertEqual(stats['by_technologist'][0],
+                         {'key': 'technologist', 'orders': 4, 'reclamations': 2, 'rate': 0.5})
+        # Рекламация относится к типу родительского заказа
+        by_type = {row['key']: row for row in stats['by_order_type']}
+        self.assertEqual(by_type['Н']['reclamations'], 2)
+        self.assertEqual(by_type['К']['reclamations'], 0)
+        self.assertEqual(stats['top_reasons'][0], {'term': 'скол', 'count': 2})
+
+    def test_weeks_grouped_by_year(self):
+        """Проверяет, что одна и та же неделя разных лет считается отдельно."""
+        Order.objects.bulk_create(
+            Order(customer=self.customer, manager=self.manager, month=3, week=2, order_type='Н',
+                  order_number=f'{self.customer.code}-{year}-900Н')
+            for year in (23, 24)
+        )
+        by_week = {row['key']: row for row in reclamation_stats()['by_week']}
+        self.assertEqual(by_week['2023-03/2']['orders'], 1)
+        self.assertEqual(by_week['2024-03/2']['orders'], 1)
+
+    def test_cache_invalidated_on_reclamation(self):
+        """Проверяет сброс кэша при создании новой рекламации."""
+        reclamation_stats()
+        with self.assertNumQueries(0):
+            reclamation_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_order(self.customer, parent_order=self.parents[3], sub_order_type='РЕК', order_type='Н',
+                       reclamation_reason='царапина')
+        self.assertEqual(reclamation_stats()['reclamations'], 3)
+
+    def test_cache_invalidated_on_main_order_edit_and_delete(self):
+        """Проверяет сброс кэша при новом основном заказе, правке типа доп. заказа и удалении."""
+        self.assertEqual(reclamation_stats()['orders'], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            extra = make_order(self.customer)
+        self.assertEqual(reclamation_stats()['orders'], 6)
+
+        addition = Order.objects.get(sub_order_type='ДОП')
+        addition.sub_order_type = 'РЕК'
+        with self.captureOnCommitCallbacks(execute=True):
+            addition.save()
+        self.assertEqual(reclamation_stats()['reclamations'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra.delete()
+        self.assertEqual(reclamation_stats()['orders'], 5)
+
+    def test_top_terms_skip_stop_words(self):
+        import numpy as np
+
+        reasons = np.array(['Скол на фасаде', 'скол для кромки', 'без'], dtype=object)
+        self.assertEqual(top_terms(reasons, top=2), [{'term': 'скол', 'count': 2}, {'term': 'кромки', 'count': 1}])
+
+    def test_endpoint_and_command(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('reclamation_analytics'), {'top': 1})
+        self.assertEqual(response.json()['top_reasons'], [{'term': 'скол', 'count': 2}])
+        out = StringIO()
+        call_command('reclamation_report', '--json', stdout=out, stderr=StringIO())
+        self.assertEqual(json.loads(out.getvalue())['reclamations'], 2)
+
+
+class ArchiveOrdersTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.old = make_order(cls.customer, status='completed', start_date=date(2020, 1, 10))
+        cls.blocked = make_order(cls.customer, status='completed', start_date=date(2020, 1, 10))
+        cls.recent = make_order(cls.customer, status='completed', start_date=date.today())
+        cls.active = make_order(cls.customer, status='in_progress', start_date=date(2020, 1, 10))
+        cls.sub_order, cls.open_sub_order = Order.objects.bulk_create([
+            Order(customer=cls.customer, manager=cls.manager, month=2, week=1, order_type='Н', status='completed',
+                  start_date=date(2020, 2, 1), order_number=f'{cls.old.order_number}-ДОП', parent_order=cls.old,
+                  sub_order_type='ДОП'),
+            Order(customer=cls.customer, manager=cls.manager, month=1, week=2, order_type='Н',
+                  start_date=date(2020, 1, 11), order_number=f'{cls.blocked.order_number}-ДОД',
+                  parent_order=cls.blocked, sub_order_type='ДОД'),
+        ])
+        OrderComment.objects.create(order=cls.old, user=cls.manager, text="архивный комментарий")
+        OrderFile.objects.create(order=cls.sub_order, file='order_files/old.pdf')
+
+    def test_archive_moves_families(self):
+        """Проверяет перенос заказа с доп. заказами, комментариями и файлами."""
+        moved = archive_orders(months=12, batch_size=1, today=date(2025, 1, 1))
+        self.assertEqual(moved, 2)
+        self.assertFalse(Order.objects.filter(pk__in=[self.old.pk, self.sub_order.pk]).exists())
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)),
+                         {self.blocked.pk, self.open_sub_order.pk, self.recent.pk, self.active.pk})
+
+        archived = ArchivedOrder.objects.get(order_number=self.old.order_number)
+        self.assertEqual(archived.customer_code, 'РИК')
+        self.assertEqual(archived.data['status'], 'completed')
+        self.assertEqual(archived.comments.get().username, 'manager')
+        sub_order = ArchivedOrder.objects.get(original_id=self.sub_order.pk)
+        self.assertEqual(sub_order.parent_original_id, self.old.pk)
+        self.assertEqual(sub_order.files.get().file, 'order_files/old.pdf')
+
+    def test_archive_keeps_customer_stats(self):
+        """Проверяет, что архивация не меняет статистику заказчика, а сверка учитывает архив."""
+        Order.objects.filter(pk=self.old.pk).update(total_area=3.5)
+        reconcile_customer_stats(fix=True)
+        before = CustomerStats.objects.filter(customer=self.customer).values().get()
+        archive_orders(months=12, today=date(2025, 1, 1))
+        self.assertTrue(ArchivedOrder.objects.filter(original_id=self.old.pk).exists())
+        self.assertEqual(CustomerStats.objects.filter(customer=self.customer).values().get(), before)
+        self.assertEqual(reconcile_customer_stats(), [])
+
+    def test_archived_numbers_not_reused(self):
+        """Проверяет, что номер архивного заказа не выдается новому заказу и архивация не ломается."""
+        customer = make_customer(self.manager, code='АРХ')
+        only_order = make_order(customer, status='completed', start_date=date(2020, 1, 10))
+        archive_orders(months=12, today=date(2025, 1, 1))
+        self.assertTrue(ArchivedOrder.objects.filter(original_id=only_order.pk).exists())
+
+        new_order = make_order(customer, status='completed', start_date=date(2020, 1, 10))
+        self.assertNotEqual(new_order.order_number, only_order.order_number)
+        self.assertEqual(parse(new_order.order_number).sequence, 2)
+        archive_orders(months=12, today=date(2025, 1, 1))
+        self.assertTrue(ArchivedOrder.objects.filter(original_id=new_order.pk).exists())
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса проверяется для SQLite')
+    def test_number_allocation_uses_archive_index(self):
+        """Проверяет, что при выдаче номера архив читается по индексу, а не просматривается целиком."""
+        with CaptureQueriesContext(connection) as queries:
+            make_order(self.customer)
+        sql = next(query['sql'] for query in queries if 'FROM "orders_archivedorder"' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('SCAN', plan)
+        self.assertIn('customer_code', plan)
+
+    def test_archive_undated_orders_by_number_year(self):
+        """Проверяет, что заказ без даты начала архивируется по году в номере, а текущий - нет."""
+        undated_old = make_order(self.customer, status='completed')
+        Order.objects.filter(pk=undated_old.pk).update(order_number='РИК-19-001Н')
+        undated_current = make_order(self.customer, status='completed')
+        archive_orders(months=12, today=date(2025, 1, 1))
+        self.assertTrue(ArchivedOrder.objects.filter(original_id=undated_old.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=undated_current.pk).exists())
+
+    def test_archive_dry_run_and_command(self):
+        self.assertEqual(archive_orders(months=12, today=date(2025, 1, 1), dry_run=True), 1)
+        self.assertFalse(ArchivedOrder.objects.exists())
+        call_command('archive_orders', '--months', '12', stdout=StringIO())
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+    def test_archive_admin_read_only_search(self):
+        """Проверяет поиск по архиву в админке и отсутствие прав на изменение."""
+        archive_orders(months=12, today=date(2025, 1, 1))
+        admin_user = make_user('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:orders_archivedorder_changelist'), {'q': self.old.order_number})
+        self.assertContains(response, self.old.order_number)
+        archived = ArchivedOrder.objects.get(original_id=self.old.pk)
+        response = self.client.get(reverse('admin:orders_archivedorder_change', args=[archived.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="_save"')
+
+
+class OrderNumberCodecTest(SimpleTestCase):
+    def test_parse_examples(self):
+        """Проверяет разбор номеров из документации."""
+        self.assertEqual(parse('РИК-24-012Н-ДОП'), OrderNumber('РИК', 24, 12, 'Н', 'ДОП'))
+        self.assertEqual(parse('РИК-24-012ЛК-2'), OrderNumber('РИК', 24, 12, 'ЛК', '2'))
+        self.assertEqual(parse('РИК-24-012ЛК-2').part, 2)
+        self.assertEqual(parse('РИК-24-012Н-ДОП').sub_order_type, 'ДОП')
+        self.assertEqual(parse('РИК-24-012ЛК-2').base, 'РИК-24-012ЛК')
+
+    def test_invalid_numbers(self):
+        for number in ('', 'РИК-24', 'РИК-24-12Н', 'РИК-24-012', 'РИК-24-012X', 'РИК-24-012Н-ABC', 'РИК-2024-012Н'):
+            with self.subTest(number=number), self.assertRaises(InvalidOrderNumber):
+                parse(number)
+
+    def test_codes_match_model_choices(self):
+        self.assertEqual(set(ORDER_TYPE_CODES), {code for code, _ in Order.ORDER_TYPES})
+        self.assertEqual(set(SUB_ORDER_CODES), {code for code, _ in Order.SUB_ORDER_TYPES})
+
+    def test_round_trip_property(self):
+        """Свойство: format(parse(x)) == x и parse(format(части)) == части на случайных номерах."""
+        rng = random.Random(20241015)
+        alphabet = 'АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯABCXYZ0123456789-'
+        for _ in range(2000):
+            parts = OrderNumber(
+                client_code=''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 10))).strip('-') or 'К',
+                year=rng.randint(0, 99),
+                sequence=rng.randint(1, 99999),
+                order_type=rng.choice(ORDER_TYPE_CODES),
+                suffix=rng.choice((None, str(rng.randint(1, 20))) + SUB_ORDER_CODES),
+            )
+            number = format_order_number(*parts)
+            with self.subTest(number=number):
+                self.assertEqual(parse(number), parts)
+                self.assertEqual(str(parse(number)), number)
+
+
+class OrderAdminSearchTest(SharedFixturesMixin, TestCase):
+    def test_search_by_full_number(self):
+        """Проверяет поиск заказа по полному номеру."""
+        order = make_order(self.customer, order_type='ЛК')
+        other = make_order(self.customer)
+        self.client.force_login(make_user('admin', is_staff=True, is_superuser=True))
+        response = self.client.get(reverse('admin:orders_order_changelist'), {'q': order.order_number})
+        self.assertContains(response, order.order_number)
+        self.assertNotContains(response, other.order_number)
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_search_by_number_includes_sub_orders(self):
+        """Проверяет, что поиск по номеру находит доп. заказы с собственными номерами."""
+        order = make_order(self.customer)
+        sub_order = make_order(self.customer, parent_order=order, sub_order_type='ДОП')
+        make_order(self.customer)
+        self.client.force_login(make_user('admin', is_staff=True, is_superuser=True))
+        response = self.client.get(reverse('admin:orders_order_changelist'), {'q': order.order_number})
+        self.assertEqual({obj.pk for obj in response.context['cl'].result_list}, {order.pk, sub_order.pk})
+
+
+class OrderNumberSequenceTest(SharedFixturesMixin, TestCase):
+    def test_sequence_past_999(self):
+        """Проверяет, что после номера 1000 выдается 1001, а не повторно 1000 (сравнение не по строке)."""
+        first = make_order(self.customer)
+        number = parse(first.order_number)
+        Order.objects.filter(pk=first.pk).update(order_number=str(number._replace(sequence=999)))
+        second = make_order(self.customer)
+        self.assertEqual(parse(second.order_number).sequence, 1000)
+        self.assertEqual(parse(make_order(self.customer).order_number).sequence, 1001)
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Order
+from .signals import orders_status_changed
+
+StatusChange = namedtuple('StatusChange', ['order_id', 'customer_id', 'old_status', 'new_status'])
+
+
+def can_transition(old_status, new_status):
+    """Проверяет, разрешен ли переход заказа из статуса old_status в new_status."""
+    return new_status in Order.STATUS_TRANSITIONS.get(old_status, ())
+
+
+def _sources_for(status):
+    """Возвращает статусы, из которых разрешен переход в status."""
+    return [old for old, targets in Order.STATUS_TRANSITIONS.items() if status in targets]
+
+
+def apply_transitions(plan, strict=True, user=None):
+    """
+    Массово меняет статусы заказов.
+
+    plan - словарь {целевой статус: queryset или список id заказов}.
+    Для каждого целевого статуса выполняется один UPDATE ... WHERE id IN (...)
+    без вызова Order.save(), после чего отправляется один сигнал
+    orders_status_changed со списком всех изменений (аудит, статистика, кэши).
+
+    Заказы, уже находящиеся в целевом статусе, пропускаются. При недопустимом
+    переходе и strict=True выбрасывается ValidationError и ничего не меняется,
+    при strict=False такие заказы пропускаются.
+    Возвращает список StatusChange для фактически измененных заказов.
+    """
+    valid_statuses = dict(Order.STATUS_CHOICES)
+    for status in plan:
+        if status not in valid_statuses:
+            raise ValidationError(f'Неизвестный статус: {status}')
+
+    changes = []
+    with transaction.atomic():
+        errors = []
+        for status, orders in plan.items():
+            ids = orders.values('pk') if hasattr(orders, 'values') else list(orders)
+            rows = (Order.objects.select_for_update().filter(pk__in=ids).exclude(status=status)
+                    .values_list('pk', 'customer_id', 'status'))
+            for order_id, customer_id, old_status in rows:
+                if can_transition(old_status, status):
+                    changes.append(StatusChange(order_id, customer_id, old_status, status))
+                else:
+                    errors.append(f'Заказ {order_id}: переход "{valid_statuses[old_status]}" -> '
+                                  f'"{valid_statuses[status]}" запрещен')
+        if errors and strict:
+            raise ValidationError(errors)
+
+        for status in plan:
+            ids = [change.order_id for change in changes if change.new_status == status]
+            if ids:
+                Order.objects.filter(pk__in=ids, status__in=_sources_for(status)).update(status=status)
+
+        if changes:
+            orders_status_changed.send(sender=Order, changes=changes, user=user)
+    return changes
+
+
+def bulk_transition(orders, status, strict=True, user=None):
+    """Переводит заказы (queryset или список id) в статус status. См. apply_transitions."""
+    return apply_transitions({status: orders}, strict=strict, user=user)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('board/', views.board, name='order_board'),
+    path('analytics/reclamations/', views.reclamation_analytics, name='reclamation_analytics'),
+    path('<int:pk>/comments/', views.order_comments, name='order_comments'),
+    path('<int:pk>/comments/read/', views.order_comments_read, name='order_comments_read'),
+]
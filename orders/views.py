@@ -1,3 +1,80 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
 
-# Create your views here.
+from .analytics import reclamation_stats
+from .board import snapshot as board_snapshot
+from .comments import (DEFAULT_PAGE_SIZE, InvalidCursor, comment_page, decode_cursor, encode_cursor,
+                       mark_comments_read)
+from .models import Order
+
+
+@login_required
+@require_GET
+def order_comments(request, pk):
+    """Возвращает страницу комментариев заказа в JSON (курсорная пагинация: ?cursor=...&limit=...)."""
+    order = get_object_or_404(Order.objects.only('pk'), pk=pk)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        comments, next_cursor = comment_page(order, cursor=request.GET.get('cursor'), limit=limit)
+    except (InvalidCursor, ValueError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': comment.pk,
+                'user': comment.user.username,
+                'text': comment.text,
+                'created_at': comment.created_at.isoformat(),
+                'cursor': encode_cursor(comment),
+            }
+            for comment in comments
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@require_POST
+def order_comments_read(request, pk):
+    """
+    Отмечает комментарии заказа прочитанными текущим пользователем до
+    последнего показанного ему комментария (cursor из ответа order_comments).
+    """
+    order = get_object_or_404(Order.objects.only('pk'), pk=pk)
+    try:
+        last_seen_at, _ = decode_cursor(request.POST.get('cursor', ''))
+    except InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    marker = mark_comments_read(request.user, order, until=last_seen_at)
+    return JsonResponse({'last_read_at': marker.last_read_at.isoformat()})
+
+
+@login_required
+@require_GET
+def board(request):
+    """
+    Отдает открытые заказы для табло цеха (JSON со списком строк, см. orders.board).
+    Если данные не менялись, возвращает 304 по заголовку If-None-Match.
+    """
+    etag, payload = board_snapshot.payload()
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(payload, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@login_required
+@require_GET
+def reclamation_analytics(request):
+    """Возвращает сводку по рекламациям в JSON (?top=N - количество частых причин)."""
+    try:
+        top = max(1, min(int(request.GET.get('top', 10)), 100))
+    except ValueError:
+        return JsonResponse({'error': 'Параметр top должен быть числом'}, status=400)
+    return JsonResponse(reclamation_stats(top=top), json_dumps_params={'ensure_ascii': False})
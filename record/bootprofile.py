@@ -0,0 +1,128 @@
+"""
+Профилирование запуска: время импорта модулей и AppConfig.ready().
+
+Включается переменной окружения RECORD_BOOT_PROFILE=1 для manage.py,
+record.wsgi и record.asgi. После загрузки приложений Django в stderr
+печатается отчет: самые долгие импорты (собственное и полное время),
+время ready() каждого приложения и общее время запуска. Число строк
+отчета задается переменной RECORD_BOOT_PROFILE_TOP (по умолчанию 25).
+
+Модуль не импортирует Django на уровне модуля, чтобы импорт самого Django
+тоже попадал в замер.
+"""
+import os
+import sys
+import time
+
+# Модули, которые не должны загружаться при запуске (только при использовании функций)
+HEAVY_MODULES = ('numpy', 'selenium', 'PIL')
+
+_started = None
+_imports = {}  # имя модуля -> [полное время, собственное время]
+_ready = {}  # метка приложения -> время ready()
+_stack = []
+
+
+class _TimingLoader:
+    """Обертка загрузчика, замеряющая выполнение модуля."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        _stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - started
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += total
+            _imports[module.__name__] = [total, total - children]
+
+
+class _TimingFinder:
+    """Мета-искатель, который делегирует поиск остальным и оборачивает найденный загрузчик."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+def enabled():
+    return _started is not None
+
+
+def enable_from_env():
+    """Включает профилирование, если задана переменная RECORD_BOOT_PROFILE."""
+    if os.environ.get('RECORD_BOOT_PROFILE') and not enabled():
+        enable()
+
+
+def enable():
+    """Устанавливает замер импортов и ready(); отчет печатается после загрузки приложений."""
+    global _started
+    _started = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+    from django.apps.config import AppConfig
+    from django.apps.registry import Apps
+
+    original_create = AppConfig.create.__func__
+    original_populate = Apps.populate
+
+    def create(cls, entry):
+        app_config = original_create(cls, entry)
+        ready = app_config.ready
+
+        def timed_ready():
+            started = time.perf_counter()
+            try:
+                ready()
+            finally:
+                _ready[app_config.label] = time.perf_counter() - started
+
+        app_config.ready = timed_ready
+        return app_config
+
+    def populate(self, installed_apps=None):
+        was_ready = self.ready
+        original_populate(self, installed_apps)
+        if not was_ready:
+            report()
+
+    AppConfig.create = classmethod(create)
+    Apps.populate = populate
+
+
+def report(stream=None, top=None):
+    """Печатает отчет о запуске."""
+    stream = stream or sys.stderr
+    top = top or int(os.environ.get('RECORD_BOOT_PROFILE_TOP', 25))
+    total = time.perf_counter() - _started
+
+    print(f'Запуск: {total * 1000:.1f} мс, импортировано модулей: {len(_imports)}', file=stream)
+    print('Самые долгие импорты (собственное / полное время, мс):', file=stream)
+    by_self = sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (inclusive, own) in by_self[:top]:
+        print(f'{own * 1000:9.1f} {inclusive * 1000:9.1f}  {name}', file=stream)
+    print('AppConfig.ready() (мс):', file=stream)
+    for label, elapsed in sorted(_ready.items(), key=lambda item: item[1], reverse=True):
+        print(f'{elapsed * 1000:9.1f}  {label}', file=stream)
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    if heavy:
+        print(f'Внимание: при запуске загружены тяжелые модули: {", ".join(heavy)}', file=stream)
@@ -0,0 +1,77 @@
+"""
+Маршрутизация запросов между основной базой и репликой для отчетов.
+
+Отчетные запросы (агрегаты, выгрузки, поиск) явно направляются на реплику
+через reporting()/reporting_db(): аналитика рекламаций, сверка статистики
+заказчиков без исправления и списки объектов в админке (ReportingAdminMixin). Сразу после записи текущего пользователя
+(в течение REPLICA_STICKY_SECONDS) все чтения идут в основную базу, чтобы
+пользователь не увидел устаревшие данные из-за задержки репликации.
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Момент (time.time()), до которого чтения должны идти в основную базу
+_primary_until = ContextVar('primary_until', default=0.0)
+
+
+def replica_alias():
+    """Возвращает псевдоним реплики или None, если реплика не настроена."""
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def record_write():
+    """Отмечает запись: ближайшие REPLICA_STICKY_SECONDS чтения идут в основную базу."""
+    _primary_until.set(time.time() + sticky_seconds())
+
+
+def primary_until():
+    return _primary_until.get()
+
+
+def set_primary_until(timestamp):
+    """Устанавливает окно привязки к основной базе (используется middleware). Возвращает токен для сброса."""
+    return _primary_until.set(timestamp)
+
+
+def reset_primary_until(token):
+    _primary_until.reset(token)
+
+
+def is_sticky():
+    """Возвращает True, если чтения сейчас должны идти в основную базу."""
+    return _primary_until.get() > time.time()
+
+
+def reporting_db():
+    """Возвращает базу для отчетных чтений: реплику или основную базу при ее отсутствии/после записи."""
+    alias = replica_alias()
+    if alias is None or is_sticky():
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def reporting(queryset):
+    """Направляет queryset отчета на реплику (см. reporting_db())."""
+    return queryset.using(reporting_db())
+
+
+class ReportingAdminMixin:
+    """
+    Примесь для ModelAdmin: список объектов (просмотр, фильтры и поиск) читается
+    через reporting(). Формы редактирования и действия над выбранными объектами
+    (POST) по-прежнему работают с основной базой.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if request.method == 'GET' and match is not None and match.url_name.endswith('_changelist'):
+            return reporting(queryset)
+        return queryset
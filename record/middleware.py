@@ -0,0 +1,33 @@
+import time
+
+from .db import primary_until, reset_primary_until, set_primary_until, sticky_seconds
+
+PRIMARY_COOKIE = 'primary_until'
+
+
+class StickyPrimaryMiddleware:
+    """
+    Переносит окно привязки к основной базе между запросами пользователя.
+
+    После запроса с записью в cookie сохраняется момент окончания окна;
+    следующие запросы в пределах окна читают из основной базы, а не из реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            stored = float(request.COOKIES.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            stored = 0.0
+        token = set_primary_until(stored)
+        try:
+            response = self.get_response(request)
+            until = primary_until()
+            if until > stored and until > time.time():
+                response.set_cookie(PRIMARY_COOKIE, f'{until:.3f}', max_age=sticky_seconds(), httponly=True,
+                                    samesite='Lax')
+            return response
+        finally:
+            reset_primary_until(token)
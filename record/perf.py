@@ -0,0 +1,263 @@
+"""
+Профилирование запросов к базе по логическим операциям.
+
+Участок кода помечается именем операции декоратором или контекстным
+менеджером operation('order.number_alloc'). Пока включен PERF_PROFILING,
+на время самой внешней операции на все соединения с базой ставится
+execute_wrapper, и каждый запрос учитывается в гистограмме операции, которая
+выполнялась в этот момент (вложенная операция перекрывает внешнюю). Для
+запросов дольше PERF_SLOW_QUERY_MS сохраняется стек вызовов (последние
+PERF_SLOW_QUERY_SAMPLES запросов).
+
+Статистика копится в памяти процесса и не чаще раза в PERF_PUBLISH_SECONDS
+записывается в файл <хост>-<pid>.json в каталоге PERF_DUMP_DIR. Страница /__perf__/
+(только для персонала) и команда perf_dump объединяют файлы всех процессов.
+При выключенном профилировании operation() сводится к одной проверке настройки.
+"""
+import contextvars
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import ContextDecorator, ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+# Верхние границы корзин гистограммы, мс
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+SQL_PREVIEW_LENGTH = 300
+
+_current = contextvars.ContextVar('perf_operation', default=None)
+
+
+class Histogram:
+    """Гистограмма длительностей (мс) с количеством, суммой и максимумом."""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        for index, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[index] += 1
+                break
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.count = data['count']
+        histogram.total = data['total_ms']
+        histogram.max = data['max_ms']
+        histogram.buckets = list(data['buckets'].values())
+        return histogram
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает заданная доля значений."""
+        threshold = self.count * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= threshold:
+                return min(bound, self.max)
+        return 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(self.percentile(0.95), 3),
+            'max_ms': round(self.max, 3),
+            'buckets': {('inf' if bound == float('inf') else bound): count
+                        for bound, count in zip(BUCKETS_MS, self.buckets)},
+        }
+
+
+class PerfRegistry:
+    """Накопленная статистика операций и образцы медленных запросов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+            self._queries = {}
+            self._slow = deque(maxlen=getattr(settings, 'PERF_SLOW_QUERY_SAMPLES', 50))
+            self._published_at = 0.0
+
+    def record_call(self, name, ms):
+        with self._lock:
+            self._calls.setdefault(name, Histogram()).add(ms)
+
+    def record_query(self, name, sql, ms, stack=None):
+        with self._lock:
+            self._queries.setdefault(name, Histogram()).add(ms)
+            if stack is not None:
+                self._slow.append({'operation': name, 'ms': round(ms, 3), 'sql': sql[:SQL_PREVIEW_LENGTH],
+                                   'stack': stack, 'at': time.time()})
+
+    def report(self):
+        """Сводка: операции по убыванию суммарного времени запросов и медленные запросы (новые первыми)."""
+        with self._lock:
+            names = set(self._calls) | set(self._queries)
+            operations = [
+                {'operation': name,
+                 'calls': self._calls.get(name, Histogram()).as_dict(),
+                 'queries': self._queries.get(name, Histogram()).as_dict()}
+                for name in names
+            ]
+            slow = list(reversed(self._slow))
+        operations.sort(key=lambda item: (-item['queries']['total_ms'], item['operation']))
+        return {'enabled': is_enabled(), 'operations': operations, 'slow_queries': slow}
+
+    def publish(self, force=False):
+        """Записывает сводку процесса в PERF_DUMP_DIR (не чаще раза в PERF_PUBLISH_SECONDS, если не force)."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._published_at < settings.PERF_PUBLISH_SECONDS:
+                return
+            self._published_at = now
+        report = self.report()
+        process = f'{socket.gethostname()}-{os.getpid()}'
+        report.update(process=process, published_at=now)
+        directory = Path(settings.PERF_DUMP_DIR)
+        path = directory / f'{process}.json'
+        temporary = directory / f'{process}.{threading.get_ident()}.tmp'
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(report, ensure_ascii=False), encoding='utf-8')
+            os.replace(temporary, path)  # читатели не видят недописанный файл
+        except OSError:
+            pass  # профилирование не должно ломать обработку запроса
+
+
+registry = PerfRegistry()
+
+
+def published_reports():
+    """Сводки, опубликованные процессами в PERF_DUMP_DIR."""
+    reports = []
+    for path in sorted(Path(settings.PERF_DUMP_DIR).glob('*.json')):
+        try:
+            reports.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue  # файл удален или перезаписывается
+    return reports
+
+
+def clear_published():
+    for path in Path(settings.PERF_DUMP_DIR).glob('*.json'):
+        path.unlink(missing_ok=True)
+
+
+def merge_reports(reports):
+    """Объединяет сводки нескольких процессов в одну (гистограммы складываются)."""
+    calls, queries, slow = {}, {}, []
+    for report in reports:
+        for item in report['operations']:
+            for target, key in ((calls, 'calls'), (queries, 'queries')):
+                target.setdefault(item['operation'], Histogram()).merge(Histogram.from_dict(item[key]))
+        slow.extend(report['slow_queries'])
+    operations = [{'operation': name, 'calls': calls[name].as_dict(), 'queries': queries[name].as_dict()}
+                  for name in calls]
+    operations.sort(key=lambda item: (-item['queries']['total_ms'], item['operation']))
+    slow.sort(key=lambda sample: -sample['at'])
+    return {
+        'enabled': is_enabled(),
+        'processes': [report.get('process') for report in reports],
+        'operations': operations,
+        'slow_queries': slow[:settings.PERF_SLOW_QUERY_SAMPLES],
+    }
+
+
+def is_enabled():
+    return settings.PERF_PROFILING
+
+
+def current_operation():
+    """Имя выполняющейся операции или None."""
+    return _current.get()
+
+
+def _project_stack():
+    """Стек вызовов, ограниченный файлами проекта (без Django и сторонних пакетов)."""
+    base_dir = str(settings.BASE_DIR)
+    frames = []
+    for frame in traceback.extract_stack()[:-3]:
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename:
+            frames.append(f'{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}')
+    return frames
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        name = _current.get()
+        if name is not None:
+            stack = _project_stack() if ms >= settings.PERF_SLOW_QUERY_MS else None
+            registry.record_query(name, sql, ms, stack)
+
+
+class operation(ContextDecorator):
+    """
+    Помечает запросы к базе именем логической операции.
+
+    Использование: @operation('customer.clean') или with operation('order.number_alloc'): ...
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._token = None
+        self._wrappers = None
+        self._started = None
+
+    def _recreate_cm(self):
+        # Декоратор создает новый экземпляр на каждый вызов: состояние не делится между потоками
+        return type(self)(self.name)
+
+    def __enter__(self):
+        if not settings.PERF_PROFILING:
+            return self
+        outermost = _current.get() is None
+        self._token = _current.set(self.name)
+        if outermost:
+            self._wrappers = ExitStack()
+            for conn in connections.all():
+                self._wrappers.enter_context(conn.execute_wrapper(_execute_wrapper))
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._token is None:
+            return False
+        registry.record_call(self.name, (time.perf_counter() - self._started) * 1000)
+        if self._wrappers is not None:
+            self._wrappers.close()
+            self._wrappers = None
+            registry.publish()
+        _current.reset(self._token)
+        self._token = None
+        return False
@@ -0,0 +1,31 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from .db import is_sticky, record_write, replica_alias
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер баз данных: все записи и миграции - в основную базу, чтения - туда же,
+    кроме запросов, явно направленных на реплику через record.db.reporting().
+
+    Каждая запись открывает окно привязки к основной базе для текущего запроса.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if is_sticky() or instance is None:
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаем из той же базы, откуда загружен экземпляр
+        return instance._state.db or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        record_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика - копия основной базы, схема на нее не накатывается
+        return db == DEFAULT_DB_ALIAS
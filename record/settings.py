@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'record.middleware.StickyPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +84,64 @@ DATABASES = {
     }
 }
 
+# Реплика для отчетных запросов (см. record/db.py). Локально это копия db.sqlite3,
+# которую обновляет команда `manage.py sync_replica`.
+REPLICA_DATABASE_PATH = os.environ.get('WEBREESTR_REPLICA_DB')
+if REPLICA_DATABASE_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DATABASE_PATH,
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASE_ALIAS = 'replica' if REPLICA_DATABASE_PATH else None
+# Сколько секунд после записи пользователя его чтения идут в основную базу
+REPLICA_STICKY_SECONDS = 5
+
+DATABASE_ROUTERS = ['record.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Кэш должен быть общим для всех процессов (gunicorn): через него процессы узнают
+# об изменениях снимка табло и аналитики рекламаций и считают попытки входа.
+# В рабочем окружении - Redis (WEBREESTR_REDIS_URL), без него - файловый кэш,
+# общий для процессов на одной машине.
+
+REDIS_URL = os.environ.get('WEBREESTR_REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('WEBREESTR_CACHE_DIR', str(BASE_DIR / 'cache')),
+        }
+    }
+
+# Ограничение попыток входа (см. users/ratelimit.py)
+# Не больше LIMIT попыток за WINDOW секунд с одного IP / для одного имени пользователя
+LOGIN_RATE_IP_LIMIT = 20
+LOGIN_RATE_IP_WINDOW = 60
+LOGIN_RATE_USER_LIMIT = 5
+LOGIN_RATE_USER_WINDOW = 60
+LOGIN_LOCKOUT_THRESHOLD = 5
+LOGIN_LOCKOUT_BASE_SECONDS = 30
+LOGIN_LOCKOUT_MAX_SECONDS = 60 * 60
+
+
+# Профилирование запросов по операциям (см. record/perf.py, страница /__perf__/)
+PERF_PROFILING = os.environ.get('WEBREESTR_PERF') == '1'
+PERF_SLOW_QUERY_MS = 50
+PERF_SLOW_QUERY_SAMPLES = 50
+# Куда и как часто процессы записывают свою статистику (читают /__perf__/ и perf_dump)
+PERF_DUMP_DIR = os.environ.get('WEBREESTR_PERF_DIR', str(BASE_DIR / 'perf'))
+PERF_PUBLISH_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -130,6 +189,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Через сколько секунд снимок табло цеха перечитывается целиком (см. orders/board.py)
+BOARD_SNAPSHOT_MAX_AGE = 30
+
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
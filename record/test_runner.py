@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from django.test.runner import DiscoverRunner
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """Результат тестов, запоминающий длительность каждого теста."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = []
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.durations.append((time.perf_counter() - self._started, test.id()))
+
+
+class TimedTestRunner(DiscoverRunner):
+    """
+    Тест-раннер, печатающий после прогона самые медленные тесты.
+
+    В параллельном режиме события тестов приходят из дочерних процессов уже
+    после выполнения, поэтому отчет о длительности не строится.
+    """
+
+    def __init__(self, slowest=10, **kwargs):
+        super().__init__(**kwargs)
+        self.slowest = slowest
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--slowest', type=int, default=10,
+                            help='Сколько самых медленных тестов показать (0 - не показывать).')
+
+    def _timing_enabled(self):
+        return self.slowest > 0 and self.parallel <= 1 and not self.debug_sql and not self.pdb
+
+    def get_resultclass(self):
+        if self._timing_enabled():
+            return TimedTextTestResult
+        return super().get_resultclass()
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        if isinstance(result, TimedTextTestResult) and result.durations:
+            self.print_timings(result.durations)
+        return result
+
+    def print_timings(self, durations):
+        total = sum(duration for duration, _ in durations)
+        print(f'\nСамые медленные тесты (тестов: {len(durations)}, всего {total:.2f} с):')
+        for duration, test_id in sorted(durations, reverse=True)[:self.slowest]:
+            print(f'{duration * 1000:9.1f} мс  {test_id}')
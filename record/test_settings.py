@@ -0,0 +1,38 @@
+"""
+Настройки для запуска тестов: `python manage.py test` использует их автоматически.
+
+Отличия от record.settings:
+    - быстрый MD5-хешер паролей вместо PBKDF2 (600 тыс. итераций на каждый create_user);
+    - SQLite в памяти, без реплики;
+    - кэш в памяти процесса вместо файлового (тесты не видят кэш рабочих процессов);
+    - схема приложений проекта создается напрямую по моделям, без миграций;
+    - тест-раннер с отчетом о самых медленных тестах (`--slowest N`).
+Параллельный запуск: `python manage.py test --parallel`.
+"""
+from .settings import *  # noqa: F401,F403
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+REPLICA_DATABASE_ALIAS = None
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+PERF_PROFILING = False
+
+MIGRATION_MODULES = {
+    'users': None,
+    'customers': None,
+    'orders': None,
+}
+
+TEST_RUNNER = 'record.test_runner.TimedTestRunner'
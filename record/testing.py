@@ -0,0 +1,49 @@
+"""
+Общие фабрики тестовых данных.
+
+SharedFixturesMixin создает отделы, пользователей и заказчика один раз на
+класс тестов (setUpTestData), а не перед каждым тестом; изменения в тестах
+откатываются транзакцией, а экземпляры копируются для каждого теста.
+"""
+from customers.models import Customer
+from orders.models import Order
+from users.models import CustomUser, Department
+
+DEFAULT_PASSWORD = 'password'
+
+
+def make_department(name='Коммерческий'):
+    return Department.objects.create(name=name)
+
+
+def make_user(username, department=None, password=DEFAULT_PASSWORD, **fields):
+    return CustomUser.objects.create_user(username=username, password=password, department=department, **fields)
+
+
+def make_customer(manager, code='РИК', name="ООО 'Рога и Копыта'", city='Москва', **fields):
+    return Customer.objects.create(name=name, city=city, code=code, manager=manager, **fields)
+
+
+def make_order(customer, manager=None, **fields):
+    """Создает заказ через Order.save() (с генерацией номера); поля можно переопределить."""
+    values = dict(month=10, week=4, order_type='Н', status='accepted')
+    values.update(fields)
+    return Order.objects.create(customer=customer, manager=manager or customer.manager, **values)
+
+
+class SharedFixturesMixin:
+    """
+    Создает для класса тестов:
+        commercial_department, design_department - отделы;
+        manager (коммерческий отдел), technologist (конструкторский отдел) - пользователи;
+        customer - заказчик с менеджером manager.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.commercial_department = make_department('Коммерческий')
+        cls.design_department = make_department('Конструкторский')
+        cls.manager = make_user('manager', cls.commercial_department)
+        cls.technologist = make_user('technologist', cls.design_department)
+        cls.customer = make_customer(cls.manager)
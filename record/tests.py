@@ -0,0 +1,264 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.contrib import admin
+from django.db import connection, connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+
+from customers.models import Customer
+from orders.comments import encode_cursor
+from orders.management.commands.sync_replica import Command as SyncReplicaCommand
+from orders.models import Order, OrderComment
+from .bootprofile import HEAVY_MODULES
+from .db import record_write, reporting, reporting_db, reset_primary_until, set_primary_until
+from .middleware import PRIMARY_COOKIE
+from .perf import current_operation, operation, registry
+from .routers import PrimaryReplicaRouter
+from .testing import SharedFixturesMixin, make_customer, make_department, make_order, make_user
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica', REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        token = set_primary_until(0.0)
+        self.addCleanup(reset_primary_until, token)
+
+    def test_reporting_uses_replica(self):
+        """Проверяет, что отчетные запросы идут на реплику."""
+        self.assertEqual(reporting_db(), 'replica')
+        self.assertEqual(reporting(Order.objects.all()).db, 'replica')
+
+    def test_sticky_primary_after_write(self):
+        """Проверяет, что после записи чтения идут в основную базу."""
+        PrimaryReplicaRouter().db_for_write(Order)
+        self.assertEqual(reporting_db(), 'default')
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Order), 'default')
+
+    def test_sticky_window_expires(self):
+        """Проверяет, что по истечении окна чтения снова идут на реплику."""
+        set_primary_until(time.time() - 1)
+        self.assertEqual(reporting_db(), 'replica')
+
+    @override_settings(REPLICA_DATABASE_ALIAS=None)
+    def test_without_replica(self):
+        """Проверяет работу без настроенной реплики."""
+        self.assertEqual(reporting_db(), 'default')
+
+    def test_migrations_only_on_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertTrue(router.allow_migrate('default', 'orders'))
+        self.assertFalse(router.allow_migrate('replica', 'orders'))
+
+    def test_admin_changelist_reads_from_replica(self):
+        """Проверяет, что список заказов в админке читается с реплики, а действия (POST) - из основной базы."""
+        model_admin = admin.site._registry[Order]
+        url = reverse('admin:orders_order_changelist')
+        for method, expected in (('get', 'replica'), ('post', 'default')):
+            request = getattr(RequestFactory(), method)(url)
+            request.resolver_match = resolve(url)
+            self.assertEqual(model_admin.get_queryset(request).db, expected)
+
+        change_url = reverse('admin:orders_order_change', args=[1])
+        request = RequestFactory().get(change_url)
+        request.resolver_match = resolve(change_url)
+        self.assertEqual(model_admin.get_queryset(request).db, 'default')
+
+
+class ReplicaCopyTest(TransactionTestCase):
+    """Локальная реплика: второй SQLite-файл, который обновляет команда sync_replica."""
+
+    def use_replica(self, path):
+        """Подключает файл path как базу 'replica' (настройки - как у основной базы)."""
+        connections.settings['replica'] = {**connections.settings['default'], 'NAME': str(path)}
+        self.addCleanup(connections.settings.pop, 'replica')
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(lambda: connections['replica'].close())
+
+    def test_reporting_reads_copied_replica(self):
+        """Проверяет, что после копирования отчетный запрос читает заказ из файла реплики."""
+        order = make_order(make_customer(make_user('manager', make_department())))
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = Path(directory, 'primary.sqlite3'), Path(directory, 'replica.sqlite3')
+            # Основная база тестов - в памяти; ее снимок в файле играет роль основного файла
+            with closing(sqlite3.connect(primary)) as target:
+                connection.connection.backup(target)
+            SyncReplicaCommand.copy(str(primary), str(replica))
+            self.use_replica(replica)
+
+            token = set_primary_until(0.0)
+            self.addCleanup(reset_primary_until, token)
+            with override_settings(REPLICA_DATABASE_ALIAS='replica'):
+                queryset = reporting(Order.objects.filter(pk=order.pk))
+                self.assertEqual(queryset.db, 'replica')
+                self.assertEqual(queryset.values_list('order_number', flat=True).get(), order.order_number)
+
+                # Заказ, созданный после копирования, на реплике появится только со следующей копией
+                later = make_order(order.customer)
+                set_primary_until(0.0)
+                self.assertFalse(reporting(Order.objects.filter(pk=later.pk)).exists())
+
+
+class StickyPrimaryMiddlewareTest(SharedFixturesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.order = make_order(cls.customer)
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def test_write_sets_cookie(self):
+        """Проверяет, что запрос с записью открывает окно привязки к основной базе."""
+        comment = OrderComment.objects.create(order=self.order, user=self.manager, text="comment")
+        response = self.client.post(reverse('order_comments_read', args=[self.order.pk]),
+                                    {'cursor': encode_cursor(comment)})
+        self.assertGreater(float(response.cookies[PRIMARY_COOKIE].value), time.time())
+
+    def test_read_does_not_set_cookie(self):
+        response = self.client.get(reverse('order_comments', args=[self.order.pk]))
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_record_write_outside_request(self):
+        token = set_primary_until(0.0)
+        self.addCleanup(reset_primary_until, token)
+        record_write()
+        with override_settings(REPLICA_DATABASE_ALIAS='replica'):
+            self.assertEqual(reporting_db(), 'default')
+
+
+class ColdStartTest(SimpleTestCase):
+    """Запуск WSGI-приложения в отдельном процессе укладывается в бюджет и не грузит тяжелые модули."""
+
+    BUDGET_SECONDS = float(os.environ.get('RECORD_BOOT_BUDGET', 3.0))
+
+    def run_python(self, code, **env):
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE='record.settings', **env)
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=environment,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+        return result, time.perf_counter() - started
+
+    def test_wsgi_cold_start_budget(self):
+        code = ('import json, sys; import record.wsgi; '
+                f'print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))')
+        result, elapsed = self.run_python(code)
+        self.assertEqual(json.loads(result.stdout), [])
+        self.assertLess(elapsed, self.BUDGET_SECONDS)
+
+    def test_boot_profile_report(self):
+        result, _ = self.run_python('import record.asgi', RECORD_BOOT_PROFILE='1')
+        self.assertIn('AppConfig.ready()', result.stderr)
+        self.assertIn('orders', result.stderr)
+
+
+class PerfProfilingTest(SharedFixturesMixin, TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        # Статистика, публикуемая процессом, пишется во временный каталог теста
+        dump_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(dump_dir.cleanup)
+        override = override_settings(PERF_DUMP_DIR=dump_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.dump_dir = Path(dump_dir.name)
+
+    def operations(self):
+        return {item['operation']: item for item in registry.report()['operations']}
+
+    def test_disabled_records_nothing(self):
+        """Проверяет, что при выключенном профилировании запросы не учитываются и обертки не ставятся."""
+        with operation('test.disabled'):
+            self.assertIsNone(current_operation())
+            make_order(self.customer)
+        self.assertEqual(registry.report()['operations'], [])
+
+    @override_settings(PERF_PROFILING=True, PERF_SLOW_QUERY_MS=10_000)
+    def test_queries_tagged_by_innermost_operation(self):
+        """Проверяет, что запросы номера заказа учитываются в order.number_alloc, остальные - в order.save."""
+        make_order(self.customer)
+        make_order(self.customer)
+        operations = self.operations()
+        self.assertEqual(operations['order.number_alloc']['calls']['count'], 2)
+        # Заказы и архив заказов - по запросу на каждый номер
+        self.assertEqual(operations['order.number_alloc']['queries']['count'], 4)
+        self.assertEqual(operations['order.save']['calls']['count'], 2)
+        self.assertGreaterEqual(operations['order.save']['queries']['count'], 2)
+        self.assertEqual(registry.report()['slow_queries'], [])
+        self.assertIsNone(current_operation())
+
+    @override_settings(PERF_PROFILING=True, PERF_SLOW_QUERY_MS=0)
+    def test_slow_queries_sampled_with_project_stack(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        with self.assertRaises(ValidationError):
+            customer.clean()  # менеджер и отдел загружаются запросами внутри clean()
+        operations = self.operations()
+        self.assertEqual(operations['customer.clean']['calls']['count'], 1)
+        sample = registry.report()['slow_queries'][0]
+        self.assertEqual(sample['operation'], 'customer.clean')
+        self.assertTrue(any(frame.startswith('customers/models.py') for frame in sample['stack']))
+
+    @override_settings(PERF_PROFILING=True)
+    def test_profile_view_tagged(self):
+        make_order(self.customer)
+        self.client.force_login(self.manager)
+        self.client.get(reverse('profile'))
+        self.assertGreaterEqual(self.operations()['profile.orders']['queries']['count'], 1)
+
+    def test_perf_page_staff_only(self):
+        self.client.force_login(self.manager)
+        self.assertEqual(self.client.get(reverse('perf_report')).status_code, 302)
+
+        self.client.force_login(make_user('perf-staff', is_staff=True))
+        registry.record_query('test.op', 'SELECT 1', 1.5)
+        with override_settings(PERF_PROFILING=True):
+            self.assertContains(self.client.get(reverse('perf_report')), 'test.op')
+            report = self.client.get(reverse('perf_report'), {'format': 'json'}).json()
+        self.assertEqual(report['operations'][0]['queries']['count'], 1)
+
+    def test_perf_dump_merges_published_processes(self):
+        """Проверяет, что perf_dump печатает статистику, опубликованную другими процессами."""
+        dump_dir = self.dump_dir
+        registry.record_query('test.op', 'SELECT 1', 1.5)
+        registry.record_call('test.op', 2.0)
+        registry.publish(force=True)
+        # Второй процесс с такой же статистикой
+        published = next(dump_dir.glob('*.json'))
+        (dump_dir / 'otherhost-1.json').write_text(published.read_text(encoding='utf-8'), encoding='utf-8')
+
+        out = StringIO()
+        call_command('perf_dump', '--json', '--reset', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['processes']), 2)
+        self.assertEqual(report['operations'][0]['queries']['count'], 2)
+        self.assertEqual(report['operations'][0]['calls']['count'], 2)
+        self.assertEqual(list(dump_dir.glob('*.json')), [])
+
+    @override_settings(PERF_PROFILING=True, PERF_PUBLISH_SECONDS=0)
+    def test_operations_published_periodically(self):
+        dump_dir = self.dump_dir
+        make_order(self.customer)
+        self.assertEqual(len(list(dump_dir.glob('*.json'))), 1)
+
+    def test_perf_dump_synthetic(self):
+        dump_dir = self.dump_dir
+        make_customer(self.manager, code='PERF')
+        out = StringIO()
+        call_command('perf_dump', '--synthetic', '3', '--json', stdout=out)
+        operations = {item['operation']: item for item in json.loads(out.getvalue())['operations']}
+        self.assertEqual(operations['order.number_alloc']['calls']['count'], 3)
+        self.assertIn('customer.clean', operations)
+        self.assertIn('profile.orders', operations)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(list(dump_dir.glob('*.json')), [])
@@ -18,8 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
 
+from .views import perf_report
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('users.urls')),
+    path('orders/', include('orders.urls')),
+    path('__perf__/', perf_report, name='perf_report'),
     path('', lambda request: redirect('login'), name='root'),
 ]
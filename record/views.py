@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
+from django.utils.html import format_html, format_html_join
+from django.views.decorators.http import require_GET
+
+from .perf import is_enabled, merge_reports, published_reports, registry
+
+
+@staff_member_required
+@require_GET
+def perf_report(request):
+    """Статистика профилирования запросов всех процессов (record.perf); ?format=json - в JSON."""
+    if is_enabled():
+        registry.publish(force=True)
+    report = merge_reports(published_reports())
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report, json_dumps_params={'ensure_ascii': False})
+
+    operations = format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td>'
+                                      '<td>{}</td><td>{}</td><td>{}</td></tr>', (
+        (item['operation'], item['calls']['count'], item['calls']['avg_ms'], item['queries']['count'],
+         item['queries']['total_ms'], item['queries']['avg_ms'], item['queries']['p95_ms'], item['queries']['max_ms'])
+        for item in report['operations']
+    ))
+    slow = format_html_join('', '<li>{} - {} мс - {}<br><code>{}</code><pre>{}</pre></li>', (
+        (datetime.fromtimestamp(sample['at']).strftime('%H:%M:%S'), sample['ms'], sample['operation'],
+         sample['sql'], '\n'.join(sample['stack']))
+        for sample in report['slow_queries']
+    ))
+    return HttpResponse(format_html(
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Профилирование запросов</title></head><body>'
+        '<h1>Профилирование запросов</h1><p>Профилирование {}. Процессов: {}. <a href="?format=json">JSON</a></p>'
+        '<table border="1" cellpadding="4"><tr><th>Операция</th><th>Вызовов</th><th>Среднее, мс</th>'
+        '<th>Запросов</th><th>Всего, мс</th><th>Среднее, мс</th><th>p95, мс</th><th>Макс., мс</th></tr>{}</table>'
+        '<h2>Медленные запросы</h2><ul>{}</ul></body></html>',
+        'включено' if report['enabled'] else 'выключено (PERF_PROFILING)', len(report['processes']), operations, slow,
+    ))
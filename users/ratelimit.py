@@ -0,0 +1,121 @@
+"""
+Ограничение частоты попыток входа.
+
+Каждая попытка входа сначала учитывается в двух счетчиках со скользящим окном:
+по IP-адресу и по имени пользователя. Превышение лимита означает отказ без
+вызова authenticate(), то есть без дорогого хеширования пароля. Кроме того,
+после LOGIN_LOCKOUT_THRESHOLD неудачных попыток подряд пара (IP, имя
+пользователя) блокируется, и длительность блокировки удваивается с каждой
+следующей неудачей (не больше LOGIN_LOCKOUT_MAX_SECONDS).
+
+Счетчики увеличиваются через cache.add() + cache.incr(), поэтому параллельные
+запросы не могут прочитать одно и то же значение и пройти сверх лимита.
+Состояние хранится в кэше Django (CACHES): incr() атомарен между процессами
+в Redis и Memcached; для файлового кэша и кэша в памяти атомарность
+обеспечивается блокировкой в пределах процесса.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    # Не больше LIMIT попыток за WINDOW секунд
+    'LOGIN_RATE_IP_LIMIT': 20,
+    'LOGIN_RATE_IP_WINDOW': 60,
+    'LOGIN_RATE_USER_LIMIT': 5,
+    'LOGIN_RATE_USER_WINDOW': 60,
+    # Блокировка после серии неудачных попыток
+    'LOGIN_LOCKOUT_THRESHOLD': 5,
+    'LOGIN_LOCKOUT_BASE_SECONDS': 30,
+    'LOGIN_LOCKOUT_MAX_SECONDS': 60 * 60,
+    'LOGIN_RATE_CACHE': 'default',
+}
+
+# incr() файлового кэша и других бэкендов без атомарного incr - это get + set
+_counter_lock = threading.Lock()
+
+
+def _setting(name):
+    return getattr(settings, name, DEFAULTS[name])
+
+
+def _cache():
+    return caches[_setting('LOGIN_RATE_CACHE')]
+
+
+def _key(kind, value):
+    digest = hashlib.sha256(value.strip().lower().encode('utf-8')).hexdigest()[:32]
+    return f'login:{kind}:{digest}'
+
+
+def client_ip(request):
+    """IP-адрес клиента. X-Forwarded-For не учитывается: за прокси его нужно передавать в REMOTE_ADDR."""
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def increment(key, timeout):
+    """Атомарно увеличивает счетчик key (создавая его) и возвращает новое значение."""
+    cache = _cache()
+    with _counter_lock:
+        cache.add(key, 0, timeout=timeout)
+        try:
+            value = cache.incr(key)
+        except ValueError:
+            # Счетчик истек между add() и incr()
+            cache.add(key, 1, timeout=timeout)
+            return 1
+        # incr() файлового кэша перезаписывает значение со сроком по умолчанию (300 с)
+        cache.touch(key, timeout)
+        return value
+
+
+def hit(key, limit, window, now=None):
+    """
+    Учитывает попытку в счетчике key со скользящим окном window секунд.
+    Возвращает 0, если попыток за окно не больше limit, иначе - сколько
+    секунд ждать. Отклоненные попытки тоже учитываются.
+    """
+    now = now if now is not None else time.time()
+    index, position = divmod(now, window)
+    count = increment(f'{key}:{int(index)}', timeout=int(window * 2) + 1)
+    previous = _cache().get(f'{key}:{int(index) - 1}', 0)
+    # Оценка числа попыток за последние window секунд: часть предыдущего окна + текущее
+    if previous * (1 - position / window) + count <= limit:
+        return 0
+    return window - position
+
+
+def login_retry_after(request, username):
+    """
+    Проверяет, можно ли обрабатывать попытку входа (до вызова authenticate()).
+    Возвращает 0, если можно, иначе - через сколько секунд можно повторить.
+    """
+    ip = client_ip(request)
+    now = time.time()
+    locked_until = _cache().get(_key('lockout', f'{ip}|{username}'), 0)
+    if locked_until > now:
+        return locked_until - now
+
+    wait = hit(_key('ip', ip), _setting('LOGIN_RATE_IP_LIMIT'), _setting('LOGIN_RATE_IP_WINDOW'), now)
+    if not wait and username:
+        wait = hit(_key('user', username), _setting('LOGIN_RATE_USER_LIMIT'), _setting('LOGIN_RATE_USER_WINDOW'), now)
+    return wait
+
+
+def register_login_failure(request, username):
+    """Учитывает неудачную попытку; после порога включает блокировку с экспоненциальным ростом."""
+    pair = f'{client_ip(request)}|{username}'
+    max_lockout = _setting('LOGIN_LOCKOUT_MAX_SECONDS')
+    failures = increment(_key('failures', pair), timeout=max_lockout * 2)
+    threshold = _setting('LOGIN_LOCKOUT_THRESHOLD')
+    if failures >= threshold:
+        lockout = min(_setting('LOGIN_LOCKOUT_BASE_SECONDS') * 2 ** (failures - threshold), max_lockout)
+        _cache().set(_key('lockout', pair), time.time() + lockout, timeout=int(lockout) + 1)
+
+
+def register_login_success(request, username):
+    """Сбрасывает счетчик неудачных попыток после успешного входа."""
+    _cache().delete(_key('failures', f'{client_ip(request)}|{username}'))
@@ -2,18 +2,15 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.test import TestCase
 from django import  forms
 from users.forms import CustomAuthenticationForm
-from users.models import Department, CustomUser
+from record.testing import make_department, make_user
 
 
 class UserFormTest(TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         # Создаем тестового пользователя и отдел
-        self.department = Department.objects.create(name="Test Department")
-        self.user = CustomUser.objects.create_user(
-            username="testuser",
-            password="testpassword",
-            department=self.department
-        )
+        cls.department = make_department("Test Department")
+        cls.user = make_user("testuser", cls.department, password="testpassword")
 
     def test_custom_authentication_form_valid_data(self):
         """Проверяем, что форма авторизации работает с правильными данными."""
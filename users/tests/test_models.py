@@ -1,6 +1,7 @@
 from django.contrib.auth.forms import AuthenticationForm
 from django.test import TestCase
-from users.models import Department, CustomUser
+from record.testing import make_department, make_user
+from users.models import Department
 
 
 class DepartmentModelTest(TestCase):
@@ -20,10 +21,10 @@ class DepartmentModelTest(TestCase):
 
 class CustomUserModelTest(TestCase):
 
-    def setUp(self):
-        self.department = Department.objects.create(name="Конструкторский")
-        self.user = CustomUser.objects.create_user(username="testuser", password="testpassword",
-                                                   department=self.department)
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department("Конструкторский")
+        cls.user = make_user("testuser", cls.department, password="testpassword")
 
     def test_user_creation(self):
         """Проверяет создание пользователя."""
@@ -0,0 +1,139 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import forms as auth_forms
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from record.testing import make_department, make_user
+from users import ratelimit
+
+
+@override_settings(
+    LOGIN_RATE_IP_LIMIT=10, LOGIN_RATE_IP_WINDOW=60,
+    LOGIN_RATE_USER_LIMIT=5, LOGIN_RATE_USER_WINDOW=60,
+    LOGIN_LOCKOUT_THRESHOLD=3, LOGIN_LOCKOUT_BASE_SECONDS=30, LOGIN_LOCKOUT_MAX_SECONDS=600,
+)
+class LoginRateLimitTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('victim', make_department('Test Department'), password='correct-password')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('login')
+
+    def post(self, username, password, ip='10.0.0.1'):
+        return self.client.post(self.url, {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_successful_login_authenticates_once(self):
+        """Пароль проверяется один раз - формой, без повторного authenticate() во view."""
+        with mock.patch.object(auth_forms, 'authenticate', wraps=auth_forms.authenticate) as authenticate:
+            response = self.post('victim', 'correct-password')
+        self.assertRedirects(response, reverse('profile'))
+        self.assertEqual(authenticate.call_count, 1)
+
+    def test_lockout_after_failures_with_exponential_backoff(self):
+        for _ in range(3):
+            self.assertEqual(self.post('victim', 'wrong').status_code, 200)
+
+        response = self.post('victim', 'correct-password')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(29 <= int(response['Retry-After']) <= 30)
+
+        # Каждая следующая неудача удваивает блокировку
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'})
+        ratelimit.register_login_failure(request, 'victim')
+        self.assertTrue(59 <= ratelimit.login_retry_after(request, 'victim') <= 60)
+        ratelimit.register_login_failure(request, 'victim')
+        self.assertTrue(119 <= ratelimit.login_retry_after(request, 'victim') <= 120)
+
+    def test_failure_counter_outlives_lockout_in_file_cache(self):
+        """Счетчик неудач в файловом кэше не истекает раньше блокировки, и она продолжает расти."""
+        request = mock.Mock(META={'REMOTE_ADDR': '10.0.0.1'})
+        now = time.time()
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir,
+        }}):
+            with mock.patch('time.time', return_value=now):
+                for _ in range(7):
+                    ratelimit.register_login_failure(request, 'victim')
+                self.assertAlmostEqual(ratelimit.login_retry_after(request, 'victim'), 480)
+
+            # Блокировка на 480 с закончилась - это дольше срока кэша по умолчанию (300 с)
+            with mock.patch('time.time', return_value=now + 490):
+                self.assertEqual(ratelimit.login_retry_after(request, 'victim'), 0)
+                ratelimit.register_login_failure(request, 'victim')
+                self.assertAlmostEqual(ratelimit.login_retry_after(request, 'victim'), 600)
+
+    def test_lockout_is_per_ip(self):
+        for _ in range(3):
+            self.post('victim', 'wrong')
+        self.assertEqual(self.post('victim', 'wrong').status_code, 429)
+        self.assertRedirects(self.post('victim', 'correct-password', ip='10.0.0.2'), reverse('profile'))
+
+    def test_success_resets_failures(self):
+        for _ in range(2):
+            self.post('victim', 'wrong')
+        self.assertRedirects(self.post('victim', 'correct-password'), reverse('profile'))
+        self.client.logout()
+        for _ in range(2):
+            self.assertEqual(self.post('victim', 'wrong').status_code, 200)
+
+    def test_username_bucket_limits_distributed_attack(self):
+        """Подбор пароля к одному пользователю с разных IP упирается в ведро по имени."""
+        statuses = [self.post('victim', 'wrong', ip=f'10.1.0.{i}').status_code for i in range(8)]
+        self.assertEqual(statuses, [200] * 5 + [429] * 3)
+
+    def test_sliding_window(self):
+        self.assertEqual(ratelimit.hit('window', 2, 10, now=100.0), 0)
+        self.assertEqual(ratelimit.hit('window', 2, 10, now=101.0), 0)
+        self.assertAlmostEqual(ratelimit.hit('window', 2, 10, now=102.0), 8.0)
+        # В следующем окне учитывается часть предыдущего (3 попытки, включая отклоненную)
+        self.assertTrue(ratelimit.hit('window', 2, 10, now=111.0))
+        self.assertEqual(ratelimit.hit('window', 2, 10, now=125.0), 0)
+
+    def test_concurrent_hits_do_not_exceed_limit(self):
+        """Одновременные попытки из многих потоков не проходят сверх лимита (в памяти и в файловом кэше)."""
+        request = mock.Mock(META={'REMOTE_ADDR': '10.9.9.9'})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backends = {
+                'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'filebased': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': cache_dir},
+            }
+            for name, backend in backends.items():
+                with self.subTest(name), override_settings(CACHES={'default': backend}):
+                    barrier = threading.Barrier(20)
+
+                    def attempt(i):
+                        barrier.wait()
+                        return ratelimit.login_retry_after(request, f'user{i}')
+
+                    with ThreadPoolExecutor(max_workers=20) as pool:
+                        results = list(pool.map(attempt, range(200)))
+                    self.assertEqual(results.count(0), 10)
+
+    def test_credential_stuffing_burst_keeps_password_checks_bounded(self):
+        """
+        Нагрузочный тест: 200 параллельных попыток (20 потоков) с одного IP по
+        разным именам пользователей. Дорогая проверка пароля (authenticate())
+        выполняется не больше лимита по IP, остальные запросы отклоняются без нее.
+        """
+        barrier = threading.Barrier(20)
+
+        def attempt(i):
+            barrier.wait()
+            return Client().post(self.url, {'username': f'user{i}', 'password': 'password123'},
+                                 REMOTE_ADDR='10.0.0.1').status_code
+
+        # authenticate() подменен: потоки не обращаются к базе, открытой транзакцией теста
+        with mock.patch.object(auth_forms, 'authenticate', return_value=None) as authenticate:
+            with ThreadPoolExecutor(max_workers=20) as pool:
+                statuses = list(pool.map(attempt, range(200)))
+        self.assertEqual(authenticate.call_count, 10)
+        self.assertEqual(statuses.count(429), 190)
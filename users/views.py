@@ -1,24 +1,38 @@
+from math import ceil
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import login, logout
 from django.contrib import messages
+from orders.comments import annotate_unread_comments
+from record.perf import operation
 from .forms import CustomAuthenticationForm
+from .ratelimit import login_retry_after, register_login_failure, register_login_success
 
 
 def user_login(request):
     if request.method == 'POST':
+        username = request.POST.get('username', '')
+        # Проверяем лимит до проверки пароля: хеширование пароля - самая дорогая часть входа
+        retry_after = login_retry_after(request, username)
+        if retry_after:
+            messages.error(request, 'Слишком много попыток входа. Попробуйте позже.')
+            response = render(request, 'users/login.html', {'form': CustomAuthenticationForm()}, status=429)
+            response['Retry-After'] = str(ceil(retry_after))
+            return response
+
         form = CustomAuthenticationForm(data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data['username']
-            password = form.cleaned_data['password']
-            user = authenticate(request, username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Добро пожаловать, {username}!')
-                return redirect('profile')
-            else:
-                messages.error(request, 'Неверное имя пользователя или пароль')
+            # Форма уже выполнила authenticate(), повторно пароль не проверяем
+            user = form.get_user()
+            login(request, user)
+            register_login_success(request, username)
+            messages.success(request, f'Добро пожаловать, {user.username}!')
+            return redirect('profile')
         else:
+            if form.non_field_errors():
+                # Неверная пара логин/пароль (ошибки полей - пустой ввод - не считаем)
+                register_login_failure(request, username)
             messages.error(request, 'Пожалуйста, исправьте ошибки в форме')
     else:
         form = CustomAuthenticationForm()
@@ -33,6 +47,7 @@ def user_logout(request):
 
 
 @login_required
+@operation('profile.orders')
 def profile(request):
-    orders = request.user.assigned_orders.all()
+    orders = annotate_unread_comments(request.user.assigned_orders.all(), request.user)
     return render(request, 'users/profile.html', {'orders': orders})